@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Write tvlinker/assets.rcc, the binary resource bundle registered at startup.
+
+The bundle is assembled from the tree, name and data tables of the pyrcc5 generated
+tvlinker/assets.py, so the two always carry identical resources. Regenerate assets.py
+with pyrcc5 first whenever assets/assets.qrc changes, then run this script.
+"""
+
+import ast
+import os
+import struct
+
+here = os.path.abspath(os.path.dirname(__file__))
+module_path = os.path.join(here, '..', 'tvlinker', 'assets.py')
+rcc_path = os.path.join(here, '..', 'tvlinker', 'assets.rcc')
+
+RCC_VERSION = 2
+HEADER_SIZE = 20
+
+
+def read_tables(filename: str) -> dict:
+    with open(filename, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename)
+    tables = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and node.targets[0].id.startswith('qt_resource_'):
+            tables[node.targets[0].id] = ast.literal_eval(node.value)
+    return tables
+
+
+def main() -> None:
+    tables = read_tables(module_path)
+    tree = tables['qt_resource_struct_v2']
+    data = tables['qt_resource_data']
+    names = tables['qt_resource_name']
+    tree_offset = HEADER_SIZE
+    data_offset = tree_offset + len(tree)
+    names_offset = data_offset + len(data)
+    with open(rcc_path, 'wb') as rcc:
+        rcc.write(b'qres')
+        rcc.write(struct.pack('>IIII', RCC_VERSION, tree_offset, data_offset, names_offset))
+        rcc.write(tree)
+        rcc.write(data)
+        rcc.write(names)
+    print('%s: %i bytes' % (os.path.relpath(rcc_path), names_offset + len(names)))
+
+
+if __name__ == '__main__':
+    main()
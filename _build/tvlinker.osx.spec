@@ -16,6 +16,8 @@ a = Analysis(['../tvlinker/__main__.py'],
              binaries=[],
              datas=[
                  ('../tvlinker/tvlinker.ini', '.'),
+                 ('../tvlinker/assets.rcc', '.'),
+                 ('../tvlinker/hosters.json', '.'),
                  ('../tvlinker/__init__.py', '.')
              ],
              hiddenimports=[],
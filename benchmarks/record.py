@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Refresh fixtures/listing.html and fixtures/post.html from the live Scene-RLS site.
+
+Uses the app's own scraper session, so Cloudflare is handled the same way as in a real scrape. Run from
+the repository root:
+
+    python3 benchmarks/record.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from standin import FIXTURES  # noqa: E402
+
+from tvlinker.core.scraper import RELEASE_URL, SOURCE_URL, Scraper  # noqa: E402
+
+
+def main() -> int:
+    scraper = Scraper(SOURCE_URL)
+    listing = scraper.get(SOURCE_URL.format(1))
+    rows = Scraper.parse_listing(listing)
+    if not len(rows):
+        sys.stderr.write('the listing page has no posts, fixtures left as they are\n')
+        return 1
+    post = scraper.get(RELEASE_URL.format(rows[0][1]))
+    for name, html in (('listing.html', listing), ('post.html', post)):
+        with open(os.path.join(FIXTURES, name), 'w', encoding='utf-8') as f:
+            f.write(html)
+        print('recorded %s' % name)
+    scraper.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
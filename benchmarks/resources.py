@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Compare loading the Qt resources from assets.rcc against importing the generated assets.py.
+
+Each strategy runs in a fresh interpreter so import caches and resident memory are measured
+from a clean start. Run from the repository root:
+
+    python3 benchmarks/resources.py --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+LOADERS = {
+    'rcc': "from PyQt5.QtCore import QResource\n"
+           "assert QResource.registerResource(os.path.join('tvlinker', 'assets.rcc'))\n",
+    'module': "import tvlinker.assets\n"
+}
+
+PROBE = """import os, resource, sys, time
+from PyQt5.QtCore import QFile
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+started = time.perf_counter()
+{loader}
+elapsed = (time.perf_counter() - started) * 1000
+assert QFile.exists(':assets/images/tvlinker.png')
+print('%f %i' % (elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss))
+"""
+
+
+def measure(loader: str) -> tuple:
+    out = subprocess.check_output([sys.executable, '-c', PROBE.format(loader=LOADERS[loader])],
+                                  universal_newlines=True)
+    elapsed, rss = out.split()
+    return float(elapsed), int(rss)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='number of runs per strategy')
+    args = parser.parse_args()
+    os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    for loader in LOADERS:
+        timings, memory = zip(*(measure(loader) for _ in range(args.runs)))
+        print('%-8s load median %8.2f ms   min %8.2f ms   rss growth median %8i KB'
+              % (loader, statistics.median(timings), min(timings), statistics.median(memory)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Local HTTP stand-in for Scene-RLS, Real-Debrid, aria2 and pyLoad that replays the files in fixtures/.
+
+Listing page 1 is fixtures/listing.html as recorded. Later pages are derived from it by moving the post
+times back three hours a page and shifting episode numbers and post URLs, so every row stays unique for
+the first 40 pages; pages past --pages come back empty like the end of the real listing. Every post URL
+serves fixtures/post.html. /files/<bytes>[/<name>] serves a file of that size whose byte at offset i is
+i % 251, honouring Range requests so resumed downloads can be verified.
+
+aria2 JSON-RPC answers addUri, tellStatus, remove and getVersion and checks the token, and Real-Debrid
+rejects an auth_token of 'bad'. Latency, jitter, error and dropped connection rates and a bandwidth cap
+are configurable for load and failure testing. Run on its own to point a development copy at it:
+
+    python3 benchmarks/standin.py --port 8765 --latency 0.2 --error-rate 0.05 --bandwidth 2MB
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import socket
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from tvlinker.filesize import parse_size  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+PATTERN = bytes(range(251)) * 512
+
+# path -> fixture answering it, JSON fixtures get {base} replaced by the stand-in's own URL
+ROUTES = {
+    '/rest/1.0/unrestrict/link': 'rd-unrestrict-link.json',
+    '/rest/1.0/unrestrict/check': 'rd-unrestrict-check.json',
+    '/rest/1.0/hosts': 'rd-hosts.json',
+    '/rest/1.0/hosts/status': 'rd-hosts-status.json',
+    '/api/login': 'pyload-login.json',
+    '/api/addPackage': 'pyload-addpackage.json'
+}
+
+_post_time = re.compile(r'(?<=<div class="p-c p-c-time">)([A-Z][a-z]{2} \d{1,2} \d{4} \d{1,2}:\d{2})')
+_episode = re.compile(r'(?<=\.S\d\d)E(\d{2,3})(?=\.)')
+_post_url = re.compile(r'href="([^"/]+?)\.html')
+_posts = re.compile(r'<div class="post">.*?(?=<div class="post">|<div class="pagination">)', re.DOTALL)
+
+
+def fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+def file_bytes(offset: int, length: int) -> bytes:
+    """length bytes of the /files/ content starting at offset.
+
+    >>> file_bytes(250, 3)
+    b'\\xfa\\x00\\x01'
+    """
+    chunk = bytearray()
+    while len(chunk) < length:
+        start = (offset + len(chunk)) % 251
+        chunk += PATTERN[start:start + length - len(chunk)]
+    return bytes(chunk)
+
+
+class Faults:
+    """Latency, failures and bandwidth applied to every request the stand-in answers."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, drop_rate: float = 0.0,
+                 bandwidth: int = 0, seed: int = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.bandwidth = bandwidth
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self.lock:
+            return self.random.random() < rate
+
+    def delay(self) -> float:
+        if not self.jitter:
+            return self.latency
+        with self.lock:
+            return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+
+def listing_page(page: int) -> bytes:
+    """Listing page page, counting from one; page 0 is the page without posts past the end of the listing."""
+    html = fixture('listing.html').decode('utf-8')
+    if page == 0:
+        return _posts.sub('', html).encode('utf-8')
+    elif page == 1:
+        return html.encode('utf-8')
+    shift = page - 1
+    html = _post_time.sub(lambda m: (datetime.strptime(m.group(1), '%b %d %Y %H:%M') - timedelta(hours=3 * shift))
+                          .strftime('%b %d %Y %H:%M'), html)
+    html = _episode.sub(lambda m: 'E%03d' % ((int(m.group(1)) + 25 * shift) % 1000), html)
+    html = _post_url.sub(lambda m: 'href="%s-p%i.html' % (m.group(1), page), html)
+    return html.encode('utf-8')
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    chunk_size = 64 * 1024
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def do_GET(self) -> None:
+        self.body = b''
+        self.route()
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get('Content-Length') or 0)
+        self.body = self.rfile.read(length) if length else b''
+        self.route()
+
+    def route(self) -> None:
+        url = urlsplit(self.path)
+        faults = self.server.faults
+        with self.server.lock:
+            self.server.hits[url.path] = self.server.hits.get(url.path, 0) + 1
+        delay = faults.delay()
+        if delay:
+            time.sleep(delay)
+        if faults.roll(faults.error_rate) or self.failing_page(url):
+            with self.server.lock:
+                self.server.errors += 1
+            self.reply(503, 'text/plain', b'service unavailable')
+        elif url.path.startswith('/rest/1.0/') and parse_qs(url.query).get('auth_token') == ['bad']:
+            self.reply(401, 'application/json', b'{"error": "bad_token", "error_code": 8}')
+        elif url.path in ROUTES:
+            body = fixture(ROUTES[url.path]).replace(b'{base}', self.server.url.encode('utf-8'))
+            self.reply(200, 'application/json', body)
+        elif url.path == '/jsonrpc':
+            self.reply(200, 'application/json', self.server.aria2.call(self.body))
+        elif url.path == '/releases/index.php':
+            page = int(parse_qs(url.query).get('p', ['1'])[0])
+            self.reply(200, 'text/html; charset=utf-8', listing_page(page if page <= self.server.pages else 0))
+        elif url.path.startswith('/releases/') and url.path.endswith('.html'):
+            self.reply(200, 'text/html; charset=utf-8', fixture('post.html'))
+        elif url.path.startswith('/files/') and url.path.split('/')[2].isdigit():
+            self.send_file(int(url.path.split('/')[2]))
+        else:
+            self.reply(404, 'text/plain', b'not found')
+
+    def failing_page(self, url) -> bool:
+        if url.path in self.server.failing_paths:
+            return True
+        if url.path != '/releases/index.php' or not len(self.server.failing):
+            return False
+        return int(parse_qs(url.query).get('p', ['1'])[0]) in self.server.failing
+
+    def reply(self, status: int, content_type: str, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.write_body(len(body), lambda offset, length: body[offset:offset + length])
+
+    def send_file(self, size: int) -> None:
+        start = 0
+        ranged = re.match(r'bytes=(\d+)-$', self.headers.get('Range') or '')
+        if ranged is not None and int(ranged.group(1)) < size:
+            start = int(ranged.group(1))
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes %i-%i/%i' % (start, size - 1, size))
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(size - start))
+        self.end_headers()
+        self.write_body(size - start, lambda offset, length: file_bytes(start + offset, length))
+
+    def write_body(self, length: int, read) -> None:
+        """Send length bytes from read(offset, length), throttled to the bandwidth cap, possibly dropping out."""
+        faults = self.server.faults
+        drop_at = length // 2 if length > 1 and faults.roll(faults.drop_rate) else length
+        sent, started = 0, time.perf_counter()
+        while sent < drop_at:
+            chunk = read(sent, min(self.chunk_size, drop_at - sent))
+            # counted before it goes out, the client can have the whole body before this handler returns
+            with self.server.lock:
+                self.server.sent += len(chunk)
+            self.wfile.write(chunk)
+            sent += len(chunk)
+            if faults.bandwidth:
+                ahead = sent / faults.bandwidth - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+        if drop_at < length:
+            with self.server.lock:
+                self.server.drops += 1
+            self.close_connection = True
+            try:
+                self.wfile.flush()
+                self.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class Aria2:
+    """Just enough of the aria2 JSON-RPC interface for the clients in tvlinker.core.managers."""
+
+    def __init__(self, secret: str = ''):
+        self.secret = secret
+        self.downloads = {}
+        self.lock = threading.Lock()
+
+    def call(self, payload: bytes) -> bytes:
+        try:
+            request = json.loads(payload.decode('utf-8'))
+        except ValueError:
+            return self.error(None, -32700, 'Parse error.')
+        params = list(request.get('params', []))
+        if len(params) and isinstance(params[0], str) and params[0].startswith('token:'):
+            token = params.pop(0)[len('token:'):]
+        elif len(params) and isinstance(params[0], str) and params[0].count(':') == 1 \
+                and not params[0].startswith(('http:', 'https:')):
+            # tvlinker sends user:password, with 'token' as the user when only a secret is set
+            user, token = params.pop(0).split(':')
+        else:
+            token = ''
+        if self.secret and token != self.secret:
+            return self.error(request.get('id'), 1, 'Unauthorized')
+        method = request.get('method', '')
+        with self.lock:
+            if method == 'aria2.addUri' and len(params) and len(params[0]):
+                gid = '%016x' % (len(self.downloads) + 1)
+                self.downloads[gid] = {'gid': gid, 'status': 'active', 'files': [{'uris': params[0]}]}
+                result = gid
+            elif method == 'aria2.tellStatus' and len(params) and params[0] in self.downloads:
+                result = self.downloads[params[0]]
+            elif method == 'aria2.remove' and len(params) and params[0] in self.downloads:
+                self.downloads[params[0]]['status'] = 'removed'
+                result = params[0]
+            elif method == 'aria2.getVersion':
+                result = {'version': '1.37.0', 'enabledFeatures': ['HTTPS']}
+            else:
+                return self.error(request.get('id'), 1, 'No such method or bad parameters: %s' % method)
+        return json.dumps({'id': request.get('id'), 'jsonrpc': '2.0', 'result': result}).encode('utf-8')
+
+    @staticmethod
+    def error(rpc_id, code: int, message: str) -> bytes:
+        return json.dumps({'id': rpc_id, 'jsonrpc': '2.0', 'error': {'code': code, 'message': message}}).encode('utf-8')
+
+
+class StandIn(ThreadingMixIn, HTTPServer):
+    """The stand-in served from a background thread, for use as a context manager.
+
+    source_url, release_url and realdebrid_url are drop-in replacements for the live endpoints.
+    """
+    daemon_threads = True
+    handler = StandInHandler
+
+    def __init__(self, port: int = 0, verbose: bool = False, faults: Faults = None, pages: int = 80,
+                 aria2_secret: str = ''):
+        HTTPServer.__init__(self, ('127.0.0.1', port), self.handler)
+        self.verbose = verbose
+        self.faults = faults or Faults()
+        self.pages = pages
+        # listing pages, counting from one, and other paths always answered with a 503
+        self.failing = set()
+        self.failing_paths = set()
+        self.aria2 = Aria2(aria2_secret)
+        self.lock = threading.Lock()
+        self.hits = {}
+        self.errors = 0
+        self.drops = 0
+        self.sent = 0
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        return 'http://127.0.0.1:%i' % self.server_address[1]
+
+    @property
+    def source_url(self) -> str:
+        return self.url + '/releases/index.php?p={0}&cat=TV%20Shows'
+
+    @property
+    def release_url(self) -> str:
+        return self.url + '/releases/{0}'
+
+    @property
+    def realdebrid_url(self) -> str:
+        return self.url + '/rest/1.0'
+
+    def start(self) -> 'StandIn':
+        self.thread = threading.Thread(target=self.serve_forever, name='standin', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> 'StandIn':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765, help='port to listen on')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    parser.add_argument('--pages', type=int, default=80, help='listing pages before the listing runs out')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added before every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random +/- seconds on top of the latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--drop-rate', type=float, default=0.0,
+                        help='fraction of responses cut off half way through the body')
+    parser.add_argument('--bandwidth', type=parse_size, default=0, help='per connection cap, e.g. 2MB')
+    parser.add_argument('--aria2-secret', default='', help='RPC secret aria2 clients must send')
+    parser.add_argument('--seed', type=int, help='seed for reproducible errors and drops')
+    args = parser.parse_args()
+    faults = Faults(args.latency, args.jitter, args.error_rate, args.drop_rate, args.bandwidth, args.seed)
+    server = StandIn(args.port, args.verbose, faults, args.pages, args.aria2_secret)
+    print('serving %s' % server.source_url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Startup benchmark for TVLinker.
+
+Launches the application repeatedly with TVLINKER_BENCHMARK set, which makes it print
+its time-to-window and time-to-first-row marks and quit as soon as the first row lands
+in the table. Run from the repository root:
+
+    python3 benchmarks/startup.py --runs 10
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+MARK = re.compile(r'^(time-to-[\w-]+): ([\d.]+) ms$')
+
+
+def run_once(timeout: int, env: dict) -> dict:
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-m', 'tvlinker'], env=env, timeout=timeout,
+                          stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+    marks = {'process-wall': (time.perf_counter() - started) * 1000}
+    for line in proc.stdout.splitlines():
+        m = MARK.match(line.strip())
+        if m:
+            marks[m.group(1)] = float(m.group(2))
+    return marks
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='number of application launches')
+    parser.add_argument('--timeout', type=int, default=120, help='seconds to wait for the first row')
+    parser.add_argument('--offscreen', action='store_true', help='use the Qt offscreen platform plugin')
+    args = parser.parse_args()
+    env = dict(os.environ, TVLINKER_BENCHMARK='1')
+    if args.offscreen:
+        env['QT_QPA_PLATFORM'] = 'offscreen'
+    results = {}
+    for run in range(args.runs):
+        for label, value in run_once(args.timeout, env).items():
+            results.setdefault(label, []).append(value)
+    for label in sorted(results):
+        values = results[label]
+        print('%-20s median %8.1f ms   min %8.1f ms   max %8.1f ms   (%i runs)'
+              % (label, statistics.median(values), min(values), max(values), len(values)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
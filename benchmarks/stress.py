@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Stress scenarios for the scraper, Real-Debrid, aria2 and download code against the fault injecting stand-in.
+
+Each scenario starts its own stand-in with the latency, error, drop and bandwidth settings given on the
+command line, drives the same code the QThreads in tvlinker/threads.py run, prints what it observed and
+fails when a correctness check does not hold. Run from the repository root:
+
+    python3 benchmarks/stress.py --latency 0.3 --jitter 0.2 --error-rate 0.1 --drop-rate 0.3 --bandwidth 4MB
+    python3 benchmarks/stress.py --only resume,cancel --seed 1
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+from standin import Faults, StandIn, file_bytes  # noqa: E402
+
+from tvlinker.core.metrics import percentile  # noqa: E402
+from tvlinker.filesize import parse_size  # noqa: E402
+
+
+class Check:
+    failures = []
+
+    @staticmethod
+    def expect(condition: bool, message: str) -> None:
+        if not condition:
+            Check.failures.append(message)
+            print('  FAILED %s' % message, flush=True)
+
+
+def report(label: str, value) -> None:
+    print('  %-28s %s' % (label, value), flush=True)
+
+
+def stress_concurrency(server: StandIn, args) -> None:
+    """Hoster lookups and Real-Debrid link checks from as many threads as the prefetcher and dialogs use."""
+    from requests import RequestException
+    from tvlinker.core.realdebrid import RealDebridClient
+    from tvlinker.core.scraper import Scraper
+    client = RealDebridClient(server.realdebrid_url, 'stress')
+    latencies, failures = [], []
+    lock = threading.Lock()
+
+    def lookup(num: int) -> None:
+        started = time.perf_counter()
+        try:
+            releases = Scraper().get_hosters(server.release_url.format('post-%i.html' % num))
+            if len(releases):
+                client.check_links([link for hoster, link in releases[0][1]])
+        except (RequestException, ValueError) as e:
+            with lock:
+                failures.append(type(e).__name__)
+        with lock:
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(lookup, range(args.requests)))
+    elapsed = time.perf_counter() - started
+    report('lookups/s', '%.1f' % (args.requests / elapsed))
+    report('latency p50/p95', '%.0f / %.0f ms' % (percentile(latencies, 50), percentile(latencies, 95)))
+    report('failed lookups', '%i of %i %s' % (len(failures), args.requests, sorted(set(failures))))
+    Check.expect(len(latencies) == args.requests, 'every lookup returned')
+
+
+def stress_scrape(server: StandIn, args) -> None:
+    """A full scrape as ScrapeWorker runs it, counting rows lost to error pages and dropped responses."""
+    from requests import RequestException
+    from tvlinker.core.scraper import Scraper
+    scraper = Scraper(server.source_url)
+    rows, failed = 0, 0
+    started = time.perf_counter()
+    for page in range(args.pages):
+        try:
+            rows += len(scraper.scrape_page(page))
+        except (RequestException, ValueError):
+            failed += 1
+    elapsed = time.perf_counter() - started
+    scraper.close()
+    expected = args.pages * 20
+    report('pages/s', '%.1f' % (args.pages / elapsed))
+    report('rows', '%i of %i, %i pages raised' % (rows, expected, failed))
+    report('server errors/drops', '%i / %i' % (server.errors, server.drops))
+    # a page either raises or yields all of its rows, anything else is a silent drop or a duplicate
+    Check.expect(rows == (args.pages - failed) * 20, 'every page that did not raise yielded all its rows')
+
+
+def stress_resume(server: StandIn, args) -> None:
+    """Built-in downloads retried over dropped connections must resume with Range and end up byte exact."""
+    from tvlinker.core.downloads import Transfer
+    size = args.download_mb * 1024 * 1024
+    target = tempfile.mkdtemp(prefix='tvlinker-stress-')
+    try:
+        path = os.path.join(target, 'download.bin')
+        transfer = Transfer(path)
+        attempts, status = 0, None
+        started = time.perf_counter()
+        while status != 'complete' and attempts < args.attempts:
+            attempts += 1
+            status = transfer.fetch('%s/files/%i' % (server.url, size))
+        elapsed = time.perf_counter() - started
+        report('attempts', '%i, ended %s' % (attempts, status))
+        report('throughput', '%.2f MB/s' % (args.download_mb / elapsed))
+        report('bytes served', '%.2f MB for a %i MB file' % (server.sent / 1024 / 1024, args.download_mb))
+        Check.expect(status == 'complete', 'download completed within %i attempts' % args.attempts)
+        if status == 'complete':
+            with open(path, 'rb') as f:
+                intact, offset = True, 0
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    intact = intact and chunk == file_bytes(offset, len(chunk))
+                    offset += len(chunk)
+            Check.expect(intact and offset == size, 'resumed file is byte exact')
+    finally:
+        shutil.rmtree(target, ignore_errors=True)
+
+
+def stress_aria2(server: StandIn, args) -> None:
+    """Concurrent addUri calls must each get their own download, and a wrong secret must be refused."""
+    from tvlinker.core.managers import aria2_add_uri
+    host, port = server.url.rsplit(':', 1)
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        accepted = list(pool.map(lambda num: aria2_add_uri('http://files.example/%i.mkv' % num, host, port,
+                                                           args.aria2_secret), range(args.requests)))
+    report('accepted', '%i of %i' % (sum(accepted), args.requests))
+    report('downloads queued', len(server.aria2.downloads))
+    # a reply dropped after aria2 queued the download reads as a refusal, so only the other way round must hold
+    Check.expect(sum(accepted) <= len(server.aria2.downloads), 'every accepted call queued a download')
+    if not server.errors and not server.drops:
+        Check.expect(sum(accepted) == args.requests, 'every call accepted without injected faults')
+    Check.expect(not aria2_add_uri('http://files.example/x.mkv', host, port, args.aria2_secret + 'x'),
+                 'a wrong RPC secret is refused')
+
+
+def stress_cancel(server: StandIn, args) -> None:
+    """ScrapeWorker cancelled mid-request from the GUI thread must stop without QThread.terminate()."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtCore import QCoreApplication, QThread, QTimer
+    from tvlinker.threads import ScrapeWorker
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    stops, failed, raised = [], [], []
+
+    def excepthook(*exc_info) -> None:
+        # PyQt aborts on an exception escaping a slot unless a hook is installed, record it as a failure instead
+        raised.append('%s: %s' % (exc_info[0].__name__, exc_info[1]))
+        QThread.currentThread().quit()
+
+    sys.excepthook = excepthook
+    for run in range(args.repeat):
+        thread = QThread()
+        worker = ScrapeWorker(server.source_url, None, args.pages)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.begin)
+        worker.workStopped.connect(thread.quit)
+        worker.workFinished.connect(thread.quit)
+        worker.scrapeFailed.connect(failed.append)
+        worker.scrapeFailed.connect(thread.quit)
+        thread.finished.connect(app.quit)
+        cancelled = []
+
+        # bound now, a timer outliving a failed run must not cancel the next one
+        def cancel(worker=worker, cancelled=cancelled) -> None:
+            cancelled.append(time.perf_counter())
+            worker.cancel()
+
+        QTimer.singleShot(int(max(server.faults.latency, 0.05) * 1500), cancel)
+        thread.start()
+        app.exec_()
+        thread.wait()
+        if len(cancelled):
+            stops.append((time.perf_counter() - cancelled[0]) * 1000)
+    sys.excepthook = sys.__excepthook__
+    report('stop after cancel p50/p95', '%.0f / %.0f ms' % (percentile(stops, 50), percentile(stops, 95)))
+    report('failed before cancel', '%i of %i %s' % (len(failed), args.repeat, failed[:1]))
+    Check.expect(not len(raised), 'no exception escaped the worker %s' % raised[:1])
+    Check.expect(len(stops) == args.repeat, 'every scrape was still running when cancelled')
+    Check.expect(not len(stops) or max(stops) < 1000 * (server.faults.latency + 5),
+                 'cancelled scrapes stop within one request')
+
+
+def stress_errors(server: StandIn, args) -> None:
+    """503 pages must end ScrapeWorker through scrapeFailed and reach HosterPrefetcher as failed fetches."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtCore import QCoreApplication, QThread
+    from tvlinker.threads import ScrapeWorker
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    # the one error is the point here, random faults on top would only blur which page failed and how
+    server.faults = Faults()
+    server.failing = {3}
+    thread = QThread()
+    worker = ScrapeWorker(server.source_url, None, args.pages)
+    worker.moveToThread(thread)
+    rows, ended = [], []
+    worker.addRow.connect(lambda page, row: rows.append(page))
+    for sig, name in ((worker.workFinished, 'finished'), (worker.workStopped, 'stopped'),
+                      (worker.scrapeFailed, 'failed')):
+        sig.connect(lambda *error, name=name: ended.append((name,) + error))
+        sig.connect(thread.quit)
+    thread.started.connect(worker.begin)
+    thread.finished.connect(app.quit)
+    thread.start()
+    app.exec_()
+    thread.wait()
+    server.failing = set()
+    report('ended', ended)
+    report('rows before the error', '%i from pages %s' % (len(rows), sorted(set(rows))))
+    Check.expect([end[0] for end in ended] == ['failed'], 'the scrape ended with scrapeFailed')
+    Check.expect(len(ended) and '503' in ended[0][-1], 'scrapeFailed carried the HTTP error')
+    Check.expect(sorted(set(rows)) == [0, 1], 'the pages before the 503 were kept')
+    stress_hoster_errors(server, app)
+
+
+def stress_hoster_errors(server: StandIn, app) -> None:
+    # a post page answered with a 503 must reach the window as a failed fetch, not as a post without links
+    from tvlinker.threads import HosterPrefetcher
+    server.failing_paths = {'/releases/post-error.html'}
+    prefetcher = HosterPrefetcher(None, 2)
+    outcomes = {}
+    prefetcher.hostersReady.connect(lambda url, releases: outcomes.setdefault(url, 'hosters'))
+    prefetcher.noLinks.connect(lambda url: outcomes.setdefault(url, 'no links'))
+    prefetcher.fetchFailed.connect(lambda url, error: outcomes.setdefault(url, 'failed'))
+    urls = [server.release_url.format(name) for name in ('post-error.html', 'post-ok.html')]
+    for url in urls:
+        prefetcher.enqueue(url, HosterPrefetcher.REQUESTED)
+    started = time.perf_counter()
+    while len(outcomes) < len(urls) and time.perf_counter() - started < 30:
+        app.processEvents()
+        time.sleep(0.01)
+    server.failing_paths = set()
+    report('hoster fetches', [outcomes.get(url) for url in urls])
+    Check.expect([outcomes.get(url) for url in urls] == ['failed', 'hosters'],
+                 'a 503 post page is reported as a failed fetch')
+
+
+SCENARIOS = (('concurrency', stress_concurrency), ('scrape', stress_scrape), ('resume', stress_resume),
+             ('aria2', stress_aria2), ('cancel', stress_cancel), ('errors', stress_errors))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', help='comma separated scenarios: %s' % ', '.join(n for n, f in SCENARIOS))
+    parser.add_argument('--latency', type=float, default=0.1, help='seconds added before every response')
+    parser.add_argument('--jitter', type=float, default=0.05, help='random +/- seconds on top of the latency')
+    parser.add_argument('--error-rate', type=float, default=0.05, help='fraction of requests answered with 503')
+    parser.add_argument('--drop-rate', type=float, default=0.2, help='fraction of responses cut off half way')
+    parser.add_argument('--bandwidth', type=parse_size, default=parse_size('8MB'), help='per connection cap')
+    parser.add_argument('--seed', type=int, help='seed for reproducible errors and drops')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=64, help='requests per concurrent scenario')
+    parser.add_argument('--pages', type=int, default=20, help='listing pages per scrape')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of the cancellation scenario')
+    parser.add_argument('--download-mb', type=int, default=32, help='size of the resumed download')
+    parser.add_argument('--attempts', type=int, default=20, help='download attempts before giving up')
+    parser.add_argument('--aria2-secret', default='stress', help='RPC secret the aria2 stand-in expects')
+    args = parser.parse_args()
+    selected = args.only.split(',') if args.only else [name for name, func in SCENARIOS]
+    for name, func in SCENARIOS:
+        if name not in selected:
+            continue
+        print('%s: %s' % (name, func.__doc__.strip()), flush=True)
+        faults = Faults(args.latency, args.jitter, args.error_rate, args.drop_rate, args.bandwidth, args.seed)
+        try:
+            with StandIn(faults=faults, pages=args.pages, aria2_secret=args.aria2_secret) as server:
+                func(server, args)
+        except ImportError as e:
+            report('skipped', e)
+    if len(Check.failures):
+        print('%i check(s) failed' % len(Check.failures))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
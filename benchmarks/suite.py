@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Offline benchmark suite replaying recorded fixtures through the local stand-in.
+
+Measures listing parse and scrape throughput, table insertion, filter latency, startup time, download
+throughput and the Real-Debrid, aria2 and pyLoad round trips without touching the live services. Results
+are compared against a saved baseline and the run fails when any of them regresses by more than the
+tolerance. Run from the repository root:
+
+    python3 benchmarks/suite.py --save-baseline      # record this machine's baseline
+    python3 benchmarks/suite.py                      # compare, exit status 1 on a regression
+    python3 benchmarks/suite.py --only parse,filter  # run a subset
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(1, os.path.dirname(os.path.abspath(__file__)))
+
+from standin import StandIn, fixture, listing_page  # noqa: E402
+
+from tvlinker.core.metrics import percentile  # noqa: E402
+from tvlinker.filesize import parse_size  # noqa: E402
+from tvlinker.timestamps import parse_timestamp  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+_row = re.compile(r'<a class="p-title" href="([^"]+)">([^<]+)</a> \(([^)]+)\)</h2>\s*'
+                  r'<div class="p-c p-c-time">([^<]+)</div>')
+
+
+def fixture_rows(pages: int) -> list:
+    """[posted, url, title, size] rows of the stand-in's first pages, read without BeautifulSoup."""
+    rows = []
+    for page in range(1, pages + 1):
+        for url, title, dlsize, posted in _row.findall(listing_page(page).decode('utf-8')):
+            rows.append([parse_timestamp(posted), url, title, parse_size(dlsize)])
+    return rows
+
+
+def timed(func, *args) -> float:
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def qt_app():
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication(sys.argv[:1])
+
+
+def bench_parse(server: StandIn, args) -> dict:
+    from tvlinker.core.scraper import Scraper
+    html = listing_page(1).decode('utf-8')
+    elapsed = timed(lambda: [Scraper.parse_listing(html) for _ in range(args.pages)])
+    post = fixture('post.html').decode('utf-8')
+    hosters = timed(lambda: [Scraper.parse_hosters(post) for _ in range(args.pages)])
+    return {'parse.listing_pages_per_sec': (args.pages / elapsed, 'pages/s', True),
+            'parse.post_pages_per_sec': (args.pages / hosters, 'pages/s', True)}
+
+
+def bench_scrape(server: StandIn, args) -> dict:
+    from tvlinker.core.scraper import Scraper
+    scraper = Scraper(server.source_url)
+    scraper.scrape_page(0)
+    scraper.reset()
+    rows = []
+    elapsed = timed(lambda: [rows.extend(scraper.scrape_page(page)) for page in range(args.pages)])
+    scraper.close()
+    return {'scrape.pages_per_sec': (args.pages / elapsed, 'pages/s', True),
+            'scrape.rows_per_sec': (len(rows) / elapsed, 'rows/s', True)}
+
+
+def bench_insert(server: StandIn, args) -> dict:
+    qt_app()
+    from tvlinker.models import ReleaseFilterProxy, ReleaseModel
+    rows = fixture_rows(args.pages)
+    model = ReleaseModel()
+    proxy = ReleaseFilterProxy()
+    proxy.setSourceModel(model)
+    merged = timed(lambda: [model.merge_release(list(row)) for row in rows])
+    bulk = ReleaseModel()
+    loaded = timed(bulk.set_releases, [list(row) for row in rows])
+    return {'insert.merge_rows_per_sec': (len(rows) / merged, 'rows/s', True),
+            'insert.bulk_rows_per_sec': (len(rows) / loaded, 'rows/s', True)}
+
+
+def bench_filter(server: StandIn, args) -> dict:
+    from tvlinker.filters import filter_releases, parse_query
+    rows = fixture_rows(args.pages)
+    queries = ('simpsons', '720p', 'size:500mb-2gb', 'age:<6h res:1080p', 'show:south park', 'group:ntb web')
+    now = max(row[0] for row in rows)
+    core = [timed(filter_releases, rows, query, now) * 1000 for query in queries for _ in range(args.repeat)]
+    results = {'filter.core_p50_ms': (percentile(core, 50), 'ms', False),
+               'filter.core_p95_ms': (percentile(core, 95), 'ms', False)}
+    try:
+        qt_app()
+    except ImportError:
+        return results
+    from tvlinker.models import ReleaseFilterProxy, ReleaseModel
+    model = ReleaseModel()
+    model.set_releases([list(row) for row in rows])
+    proxy = ReleaseFilterProxy()
+    proxy.setSourceModel(model)
+    latencies = []
+
+    def apply(text: str, ranges: dict, fields: dict) -> None:
+        # the proxy filters lazily, asking for the row count makes it run the filter
+        proxy.set_filters([text], ranges, fields)
+        proxy.rowCount()
+
+    for query in queries * args.repeat:
+        text, ranges, fields = parse_query(query, now)
+        latencies.append(timed(apply, text, ranges, fields) * 1000)
+    results.update({'filter.proxy_p50_ms': (percentile(latencies, 50), 'ms', False),
+                    'filter.proxy_p95_ms': (percentile(latencies, 95), 'ms', False)})
+    return results
+
+
+def bench_startup(server: StandIn, args) -> dict:
+    # the app runs in a child process, so a missing PyQt5 is checked for here to skip rather than time out
+    if importlib.util.find_spec('PyQt5') is None:
+        raise ImportError('No module named PyQt5')
+    from startup import run_once
+    from tvlinker.cache import ReleaseCache
+    from tvlinker.core.config import APP_NAME
+    from tvlinker.core.scraper import SOURCE_URL
+    home = tempfile.mkdtemp(prefix='tvlinker-bench-')
+    try:
+        ReleaseCache(os.path.join(home, APP_NAME, 'releases.json'), SOURCE_URL).save(fixture_rows(args.pages))
+        env = dict(os.environ, TVLINKER_BENCHMARK='1', XDG_CONFIG_HOME=home, QT_QPA_PLATFORM='offscreen')
+        runs = [run_once(60, env) for _ in range(args.repeat)]
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+    marks = [run['time-to-first-row'] for run in runs if 'time-to-first-row' in run]
+    if not len(marks):
+        raise RuntimeError('the app never reported time-to-first-row')
+    return {'startup.first_row_ms': (statistics.median(marks), 'ms', False),
+            'startup.process_ms': (statistics.median(run['process-wall'] for run in runs), 'ms', False)}
+
+
+def bench_download(server: StandIn, args) -> dict:
+    from tvlinker.core.downloads import Transfer
+    size = args.download_mb * 1024 * 1024
+    target = tempfile.mkdtemp(prefix='tvlinker-bench-')
+    try:
+        transfer = Transfer(os.path.join(target, 'download.bin'))
+        started = time.perf_counter()
+        status = transfer.fetch('%s/files/%i' % (server.url, size))
+        elapsed = time.perf_counter() - started
+    finally:
+        shutil.rmtree(target, ignore_errors=True)
+    if status != 'complete':
+        raise RuntimeError('download ended %s' % status)
+    return {'download.mb_per_sec': (args.download_mb / elapsed, 'MB/s', True)}
+
+
+def bench_services(server: StandIn, args) -> dict:
+    from tvlinker.core.managers import aria2_add_uri, pyload_add_package
+    from tvlinker.core.realdebrid import RealDebridClient
+    from tvlinker.core.scraper import Scraper
+    client = RealDebridClient(server.realdebrid_url, 'benchmark')
+    links = [link for hoster, link in Scraper.parse_hosters(fixture('post.html').decode('utf-8'))[0][1]]
+    host, port = server.url.rsplit(':', 1)
+    timings = {'unrestrict': [], 'check_links': [], 'aria2': [], 'pyload': []}
+    for _ in range(args.repeat):
+        timings['unrestrict'].append(timed(client.unrestrict, links[0]) * 1000)
+        timings['check_links'].append(timed(client.check_links, links) * 1000)
+        timings['aria2'].append(timed(aria2_add_uri, links[0], host, port, 'secret') * 1000)
+        timings['pyload'].append(timed(pyload_add_package, links, server.url, 'user', 'pass') * 1000)
+    return {'services.%s_p50_ms' % name: (percentile(values, 50), 'ms', False) for name, values in timings.items()}
+
+
+BENCHMARKS = (('parse', bench_parse), ('scrape', bench_scrape), ('insert', bench_insert),
+              ('filter', bench_filter), ('startup', bench_startup), ('download', bench_download),
+              ('services', bench_services))
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    failed = []
+    for name, (value, unit, higher_is_better) in sorted(results.items()):
+        base = baseline.get(name)
+        if base is None or not base:
+            continue
+        change = (value - base) / base
+        if (-change if higher_is_better else change) > tolerance:
+            failed.append('%s: %.2f %s against a baseline of %.2f (%+.0f%%)' % (name, value, unit, base, change * 100))
+    return failed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', help='comma separated benchmarks to run: %s' % ', '.join(n for n, f in BENCHMARKS))
+    parser.add_argument('--pages', type=int, default=40, help='listing pages per scrape, parse and table benchmark')
+    parser.add_argument('--repeat', type=int, default=5, help='repetitions of the latency benchmarks')
+    parser.add_argument('--download-mb', type=int, default=64, help='size of the benchmark download')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline results to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='largest accepted slowdown against the baseline, as a fraction')
+    args = parser.parse_args()
+    selected = args.only.split(',') if args.only else [name for name, func in BENCHMARKS]
+    results = {}
+    with StandIn() as server:
+        for name, func in BENCHMARKS:
+            if name not in selected:
+                continue
+            try:
+                measured = func(server, args)
+            except ImportError as e:
+                print('%-32s skipped, %s' % (name, e))
+                continue
+            for metric, (value, unit, higher_is_better) in sorted(measured.items()):
+                print('%-32s %12.2f %s' % (metric, value, unit), flush=True)
+            results.update(measured)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({name: value for name, (value, unit, better) in results.items()}, f, indent=4, sort_keys=True)
+        print('baseline saved to %s' % args.baseline)
+        return 0
+    if not os.path.isfile(args.baseline):
+        print('no baseline at %s, run with --save-baseline first' % args.baseline)
+        return 0
+    with open(args.baseline) as f:
+        failed = regressions(results, json.load(f), args.tolerance)
+    for line in failed:
+        print('REGRESSION %s' % line)
+    return 1 if len(failed) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -62,13 +62,16 @@ setup(
     long_description=get_description(),
     url='https://tvlinker.ozmartians.com',
     license='GPLv3+',
-    packages=['tvlinker'],
+    packages=['tvlinker', 'tvlinker.core'],
     setup_requires=['setuptools'],
     install_requires=[], # get_install_requires(),
     # extras_require=get_extras_require(),
-    package_data={'tvlinker': ['README.md', 'LICENSE', 'tvlinker/tvlinker.ini']},
+    package_data={'tvlinker': ['README.md', 'LICENSE', 'tvlinker/tvlinker.ini', 'assets.rcc', 'hosters.json']},
     data_files=get_data_files(),
-    entry_points={'gui_scripts': ['tvlinker = tvlinker.__main__:main']},
+    entry_points={
+        'gui_scripts': ['tvlinker = tvlinker.__main__:main'],
+        'console_scripts': ['tvlinker-cli = tvlinker.cli:main']
+    },
     keywords='tvlinker scraping Scene-RLS real-debrid filesharing internet tv-shows',
     classifiers=[
         'Development Status :: 4 - Beta',
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import inspect
+import itertools
 import os
 import platform
 import re
@@ -9,22 +10,41 @@ import sys
 from datetime import datetime
 from enum import Enum
 from signal import SIGINT, SIGTERM, SIG_DFL, signal
+from time import perf_counter
 
-from PyQt5.QtCore import (QEvent, QFile, QFileInfo, QModelIndex, QProcess, QSettings, QSize, QStandardPaths,
-                          QTextStream, QThread, QUrl, Qt, pyqtSlot)
+_startup_time = perf_counter()
+
+from PyQt5.QtCore import (QAbstractItemModel, QEvent, QFile, QFileInfo, QModelIndex, QPoint, QProcess, QResource,
+                          QSettings, QSize, QStandardPaths, QTextStream, QThread, QTimer, QUrl, Qt, pyqtSlot)
 from PyQt5.QtGui import QCloseEvent, QDesktopServices, QFont, QFontDatabase, QIcon, QKeyEvent, QPixmap
 from PyQt5.QtWidgets import (QAction, QApplication, QComboBox, QFileDialog, QGroupBox, QHBoxLayout, QHeaderView,
                              QLabel, QLineEdit, QMenu, QMessageBox, QProgressBar, QProxyStyle, QPushButton,
-                             QSizePolicy, QStyle, QStyleFactory, QStyleHintReturn, QStyleOption, QTableWidget,
-                             QTableWidgetItem, QVBoxLayout, QWidget, qApp)
+                             QSizePolicy, QStyle, QStyleFactory, QStyleHintReturn, QStyleOption, QTableView,
+                             QTreeView, QVBoxLayout, QWidget, qApp)
 
+from tvlinker.cache import ReleaseCache
+from tvlinker.core.config import IniSettings
+from tvlinker.core.managers import download_dir
+from tvlinker.core.metrics import LOG_ENV, metrics
+from tvlinker.core.profiling import Profiler
+from tvlinker.core.proxies import ShadowSocks
+from tvlinker.core.realdebrid import RealDebridClient
+from tvlinker.core.schedule import PollScheduler
+from tvlinker.core.scraper import RELEASE_URL, SOURCE_URL, Scraper
+from tvlinker.core.watcher import FavoritesWatcher, WatchHistory
 from tvlinker.direct_download import DirectDownload
+from tvlinker.filters import parse_query
 from tvlinker.hosters import HosterLinks
+from tvlinker.hostnames import HosterResolver
+from tvlinker.models import EpisodeGroupModel, ReleaseFilterProxy, ReleaseModel
 from tvlinker.progress import TaskbarProgress
 from tvlinker.pyload import PyloadConnection
+from tvlinker.releasename import normalize
 from tvlinker.settings import Settings
-from tvlinker.threads import Aria2Thread, DownloadThread, HostersThread, RealDebridThread, ScrapeWorker
-import tvlinker.assets as assets
+from tvlinker.stats import StatsPanel
+from tvlinker.threads import (Aria2Thread, DownloadThread, FailoverDownloadThread, HosterPrefetcher, RealDebridThread,
+                              ScrapeWorker, WatchThread)
+from tvlinker.timestamps import SOURCE_TIMEZONE
 import sip
 
 
@@ -32,9 +52,6 @@ if sys.platform == 'win32':
     # noinspection PyUnresolvedReferences
     from PyQt5.QtWinExtras import QWinTaskbarButton
 
-if sys.platform.startswith('linux'):
-    import tvlinker.notify as notify
-
 signal(SIGINT, SIG_DFL)
 signal(SIGTERM, SIG_DFL)
 
@@ -50,16 +67,30 @@ class OverrideStyle(QProxyStyle):
         return QProxyStyle.styleHint(self, hint, option, widget, returnData)
 
 
-class TVLinkerTable(QTableWidget):
-    def __init__(self, rows: int, cols: int, parent=None):
-        super(TVLinkerTable, self).__init__(rows, cols, parent)
+class StartupTimer:
+    enabled = bool(os.getenv('TVLINKER_BENCHMARK'))
+    marks = {}
+
+    @staticmethod
+    def mark(label: str) -> bool:
+        if label in StartupTimer.marks:
+            return False
+        StartupTimer.marks[label] = (perf_counter() - _startup_time) * 1000
+        if StartupTimer.enabled:
+            print('%s: %.1f ms' % (label, StartupTimer.marks[label]), flush=True)
+        return True
+
+
+class TVLinkerTable(QTableView):
+    def __init__(self, model: QAbstractItemModel, parent=None):
+        super(TVLinkerTable, self).__init__(parent)
         self.setMouseTracking(True)
-        self.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.setEditTriggers(QTableView.NoEditTriggers)
         self.verticalHeader().hide()
         self.setAlternatingRowColors(True)
-        self.setSelectionMode(QTableWidget.SingleSelection)
-        self.setSelectionBehavior(QTableWidget.SelectRows)
-        self.setHorizontalHeaderLabels(('DATE', 'URL', 'DESCRIPTION', 'SIZE'))
+        self.setSelectionMode(QTableView.SingleSelection)
+        self.setSelectionBehavior(QTableView.SelectRows)
+        self.setModel(model)
         self.horizontalHeader().setMinimumSectionSize(100)
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)  
         self.sortByColumn(0, Qt.DescendingOrder)
@@ -72,35 +103,112 @@ class TVLinkerTable(QTableWidget):
         self.verticalScrollBar().setStyle(_savestyle)
         self.setFocus()
 
+    def visible_indexes(self) -> list:
+        top = self.rowAt(0)
+        if top < 0:
+            return []
+        bottom = self.rowAt(self.viewport().height() - 1)
+        if bottom < 0:
+            bottom = self.model().rowCount() - 1
+        return [self.model().index(row, 1) for row in range(top, bottom + 1)]
+
+
+class TVLinkerTree(QTreeView):
+    def __init__(self, model: QAbstractItemModel, parent=None):
+        super(TVLinkerTree, self).__init__(parent)
+        self.setMouseTracking(True)
+        self.setEditTriggers(QTreeView.NoEditTriggers)
+        self.setAlternatingRowColors(True)
+        self.setUniformRowHeights(True)
+        self.setSelectionMode(QTreeView.SingleSelection)
+        self.setSelectionBehavior(QTreeView.SelectRows)
+        self.setModel(model)
+        self.header().setMinimumSectionSize(100)
+        self.header().setStretchLastSection(False)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.sortByColumn(0, Qt.DescendingOrder)
+        self.setColumnHidden(1, True)
+        self.header().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.header().setSectionResizeMode(2, QHeaderView.Stretch)
+        _savestyle = self.style()
+        self.setStyle(QStyleFactory.create('Fusion'))
+        self.verticalScrollBar().setStyle(_savestyle)
+
+    def visible_indexes(self) -> list:
+        indexes = []
+        index = self.indexAt(QPoint(0, 0))
+        height = self.viewport().height()
+        while index.isValid() and self.visualRect(index).top() < height:
+            indexes.append(index.sibling(index.row(), 1))
+            index = self.indexBelow(index)
+        return indexes
+
 
 class TVLinker(QWidget):
     def __init__(self, settings: QSettings, parent=None):
         super(TVLinker, self).__init__(parent)
         self.firstrun = True
-        self.rows, self.cols = 0, 0
+        self.rows = 0
+        self.scraped_pages = {}
+        self.scraped_urls = set()
+        self.page_urls = {}
+        self.listing_end = None
         self.parent = parent
         self.settings = settings
         self.taskbar = TaskbarProgress(self)
         self.init_styles()
         self.init_settings()
         self.init_icons()
-        if sys.platform.startswith('linux'):
-            notify.init(qApp.applicationName())
         layout = QVBoxLayout()
         layout.setSpacing(0)
         layout.setContentsMargins(15, 15, 15, 0)
         form_groupbox = QGroupBox(self, objectName='mainForm')
         form_groupbox.setLayout(self.init_form())
-        self.table = TVLinkerTable(0, 4, self)
+        self.model = ReleaseModel(self)
+        self.model.moreRequested.connect(self.fetch_more_pages)
+        self.proxy = ReleaseFilterProxy(self)
+        self.proxy.setSourceModel(self.model)
+        self.table = TVLinkerTable(self.proxy, self)
         self.table.doubleClicked.connect(self.show_hosters)
+        self.view = self.table
+        self.groups = None
+        self.tree = None
+        self.pending_hosters = None
+        self.watch_downloads = []
+        self.prefetcher = HosterPrefetcher(self.user_agent, FixedSettings.prefetchThreads,
+                                           FixedSettings.prefetchQueueSize, FixedSettings.prefetchCacheSize, self)
+        self.prefetcher.hostersReady.connect(self.add_hosters)
+        self.prefetcher.noLinks.connect(self.no_links)
+        self.prefetcher.fetchFailed.connect(self.hosters_failed)
+        self.prefetch_timer = QTimer(self, singleShot=True, interval=250, timeout=self.prefetch_visible)
+        self.table.verticalScrollBar().valueChanged.connect(self.prefetch_timer.start)
         layout.addWidget(form_groupbox)
         layout.addWidget(self.table)
         layout.addLayout(self.init_metabar())
         self.setLayout(layout)
+        if self.settings.value('group_episodes', False, bool):
+            self.group_episodes(True)
         qApp.setWindowIcon(self.icon_app)
+        qApp.aboutToQuit.connect(self.save_cache)
         self.resize(FixedSettings.windowSize)
+        HosterResolver.default().load(os.path.join(FixedSettings.config_path, HosterResolver.datafile))
+        self.load_cache()
         self.show()
+        QTimer.singleShot(0, self.post_init)
+
+    @pyqtSlot()
+    def post_init(self) -> None:
+        # runs from the event loop once the window has been painted
+        StartupTimer.mark('time-to-window')
+        if self.model.rowCount():
+            # rows loaded from the cache are only on screen now
+            self.first_row_shown()
+        self.taskbar.init()
+        if sys.platform.startswith('linux'):
+            import tvlinker.notify as notify
+            notify.init(qApp.applicationName())
         self.start_scraping()
+        self.prefetch_favorites()
         self.firstrun = False
 
     class ProcError(Enum):
@@ -117,20 +225,24 @@ class TVLinker(QWidget):
 
     def init_threads(self, threadtype: str = 'scrape') -> None:
         if threadtype == 'scrape':
-            if hasattr(self, 'scrapeThread'):
-                if not sip.isdeleted(self.scrapeThread) and self.scrapeThread.isRunning():
-                    self.scrapeThread.terminate()
-                    del self.scrapeWorker
-                    del self.scrapeThread
+            self.stop_scraping()
             self.scrapeThread = QThread(self)
-            self.scrapeWorker = ScrapeWorker(self.source_url, self.user_agent, self.dl_pagecount)
+            self.scrapeWorker = ScrapeWorker(self.source_url, self.user_agent, self.dl_pagecount, self.source_tz,
+                                             self.scraped_pages, self.fetched_pages())
             self.scrapeThread.started.connect(self.show_progress)
             self.scrapeThread.started.connect(self.scrapeWorker.begin)
             self.scrapeWorker.moveToThread(self.scrapeThread)
             self.scrapeWorker.addRow.connect(self.add_row)
+            self.scrapeWorker.listingEnded.connect(self.listing_ended)
             self.scrapeWorker.workFinished.connect(self.scrape_finished)
             self.scrapeWorker.workFinished.connect(self.scrapeWorker.deleteLater, Qt.DirectConnection)
             self.scrapeWorker.workFinished.connect(self.scrapeThread.quit, Qt.DirectConnection)
+            self.scrapeWorker.workStopped.connect(self.scrape_stopped)
+            self.scrapeWorker.workStopped.connect(self.scrapeWorker.deleteLater, Qt.DirectConnection)
+            self.scrapeWorker.workStopped.connect(self.scrapeThread.quit, Qt.DirectConnection)
+            self.scrapeWorker.scrapeFailed.connect(self.scrape_failed)
+            self.scrapeWorker.scrapeFailed.connect(self.scrapeWorker.deleteLater, Qt.DirectConnection)
+            self.scrapeWorker.scrapeFailed.connect(self.scrapeThread.quit, Qt.DirectConnection)
             self.scrapeThread.finished.connect(self.scrapeThread.deleteLater, Qt.DirectConnection)
         elif threadtype == 'unrestrict':
             pass
@@ -166,7 +278,12 @@ class TVLinker(QWidget):
         self.provider = 'Scene-RLS'
         self.select_provider(0)
         self.user_agent = self.settings.value('user_agent')
+        self.source_tz = self.settings.value('source_timezone', SOURCE_TIMEZONE)
         self.dl_pagecount = self.settings.value('dl_pagecount', 20, int)
+        # a page count of 0 fetches pages as the view scrolls, starting with the first page and one read ahead
+        self.dl_autopages = self.dl_pagecount == 0
+        if self.dl_autopages:
+            self.dl_pagecount = 2
         self.dl_pagelinks = FixedSettings.linksPerPage
         self.realdebrid_api_token = self.settings.value('realdebrid_apitoken')
         self.realdebrid_api_proxy = self.settings.value('realdebrid_apiproxy')
@@ -178,10 +295,27 @@ class TVLinker(QWidget):
         self.idm_exe_path = self.settings.value('idm_exe_path')
         self.kget_cmd = self.settings.value('kget_cmd')
         self.favorites = self.settings.value('favorites')
+        self.init_watch()
+
+    def init_watch(self) -> None:
+        if not hasattr(self, 'watch_timer'):
+            self.watch_timer = QTimer(self, singleShot=True, timeout=self.watch_favorites)
+        interval = self.settings.value('watch_interval', 15, int) * 60
+        if not hasattr(self, 'watch_scheduler') or self.watch_scheduler.interval != interval:
+            self.watch_scheduler = PollScheduler(interval)
+        self.schedule_watch()
+
+    @pyqtSlot()
+    def schedule_watch(self) -> None:
+        if self.settings.value('watch_favorites', False, bool) and len(self.favorites or []):
+            self.watch_timer.start(self.watch_scheduler.next_interval() * 1000)
+        else:
+            self.watch_timer.stop()
 
     def init_form(self) -> QHBoxLayout:
         self.search_field = QLineEdit(self, clearButtonEnabled=True, placeholderText='Enter search criteria')
         self.search_field.setObjectName('searchInput')
+        self.search_field.setToolTip('Narrow results with size:500mb-2gb, age:<6h, show:, season:, res:720p, source:web or group:')
         self.search_field.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
         # self.search_field.setFocus()
         self.search_field.textChanged.connect(self.clear_filters)
@@ -193,8 +327,9 @@ class TVLinker(QWidget):
         self.refresh_button = QPushButton(parent=self, flat=True, cursor=Qt.PointingHandCursor,
                                           objectName='refreshButton', toolTip='Refresh  [F5]', clicked=self.start_scraping)
         self.dlpages_field = QComboBox(self, toolTip='Pages', editable=False, cursor=Qt.PointingHandCursor)
-        self.dlpages_field.addItems(('10', '20', '30', '40', '50', '60', '70', '80'))
-        self.dlpages_field.setCurrentIndex(self.dlpages_field.findText(str(self.dl_pagecount), Qt.MatchFixedString))
+        self.dlpages_field.addItems(('Auto', '10', '20', '30', '40', '50', '60', '70', '80'))
+        self.dlpages_field.setCurrentIndex(self.dlpages_field.findText(
+            'Auto' if self.dl_autopages else str(self.dl_pagecount), Qt.MatchFixedString))
         self.dlpages_field.currentIndexChanged.connect(self.update_pagecount)
         self.settings_button = QPushButton(parent=self, flat=True, toolTip='Menu',
                                            objectName='menuButton', cursor=Qt.PointingHandCursor)
@@ -225,10 +360,12 @@ class TVLinker(QWidget):
     def select_provider(self, index: int):
         if index == 0:
             self.provider = 'Scene-RLS'
-            self.source_url = 'http://scene-rls.net/releases/index.php?p={0}&cat=TV%20Shows'
+            self.source_url = SOURCE_URL
+            self.release_url = RELEASE_URL
         elif index == 1:
             self.provider = 'TV-Release'
             self.source_url = 'http://tv-release.pw/?cat=TV'
+            self.release_url = '{0}'
         self.setWindowTitle('%s :: %s' % (qApp.applicationName(), self.provider))
 
     def settings_menu(self) -> QMenu:
@@ -236,9 +373,14 @@ class TVLinker(QWidget):
         updates_action = QAction(self.icon_updates, 'Check for updates', self, triggered=self.check_update)
         aboutqt_action = QAction('About Qt', self, triggered=qApp.aboutQt)
         about_action = QAction('About %s' % qApp.applicationName(), self, triggered=self.about_app)
+        group_action = QAction('Group episodes', self, checkable=True, triggered=self.group_episodes,
+                               checked=self.settings.value('group_episodes', False, bool))
+        stats_action = QAction('Performance stats', self, triggered=self.show_stats)
         menu = QMenu()
         menu.addAction(settings_action)
+        menu.addAction(group_action)
         menu.addAction(updates_action)
+        menu.addAction(stats_action)
         menu.addSeparator()
         menu.addAction(aboutqt_action)
         menu.addAction(about_action)
@@ -264,34 +406,97 @@ class TVLinker(QWidget):
     def check_update(self) -> None:
         QDesktopServices.openUrl(QUrl(FixedSettings.latest_release_url))
 
+    @pyqtSlot()
+    def show_stats(self) -> None:
+        if not hasattr(self, 'stats_win'):
+            self.stats_win = StatsPanel(self)
+        self.stats_win.show()
+        self.stats_win.raise_()
+
     @pyqtSlot()
     def show_settings(self) -> None:
         settings_win = Settings(self, self.settings)
         settings_win.exec_()
 
     def update_metabar(self) -> bool:
-        rowcount = self.table.rowCount()
+        rowcount = self.model.rowCount()
         self.meta_label.setText(self.meta_template % (rowcount, self.dl_pagecount * self.dl_pagelinks))
-        self.progress.setValue(rowcount)
-        self.taskbar.setProgress(rowcount / self.progress.maximum())
+        self.progress.setValue(self.rows)
+        self.taskbar.setProgress(self.rows / self.progress.maximum())
         if sys.platform == 'win32':
             self.win_taskbar_button.progress().setValue(self.progress.value())
         return True
 
-    def start_scraping(self) -> None:
-        if hasattr(self, 'scrapeThread'):
-            if not sip.isdeleted(self.scrapeThread) and self.scrapeThread.isRunning():
-                self.scrapeThread.terminate()
-                del self.scrapeWorker
-                del self.scrapeThread
+    def start_scraping(self, resume: bool = False) -> None:
+        """Scrape from the first page, or with resume from the first page not yet fetched in this refresh."""
+        if not resume:
+            self.scraped_pages = {}
+            self.scraped_urls = set()
+            self.page_urls = {}
+            self.listing_end = None
+            self.rows = 0
+        self.model.more_pages = False
         self.init_threads('scrape')
-        self.rows = 0
-        self.table.clearContents()
-        self.table.setRowCount(0)
-        self.table.setSortingEnabled(False)
+        self.view.setSortingEnabled(False)
         self.update_metabar()
         self.scrapeThread.start()
 
+    def fetched_pages(self) -> int:
+        """Number of leading listing pages fetched so far in this refresh."""
+        return next(page for page in itertools.count() if page not in self.scraped_pages)
+
+    def trim_pages(self, pagecount: int) -> None:
+        """Drop the rows of pages past pagecount without touching the network, including a partly scraped one."""
+        for page in [page for page in self.scraped_pages if page >= pagecount]:
+            del self.scraped_pages[page]
+        if self.listing_end is not None and self.listing_end >= pagecount:
+            self.listing_end = None
+        dropped = set()
+        for page in [page for page in self.page_urls if page >= pagecount]:
+            dropped.update(self.page_urls.pop(page))
+        if not len(dropped):
+            return
+        self.scraped_urls -= dropped
+        self.rows = len(self.scraped_urls)
+        self.model.retain_releases({release[1] for release in self.model.releases} - dropped)
+        self.filter_table(text='')
+
+    def scrape_running(self) -> bool:
+        return hasattr(self, 'scrapeThread') and not sip.isdeleted(self.scrapeThread) and self.scrapeThread.isRunning()
+
+    def stop_scraping(self) -> bool:
+        """Ask a running scrape to stop; it finishes the post at hand and its thread quits on its own."""
+        if not self.scrape_running():
+            return False
+        if not sip.isdeleted(self.scrapeWorker):
+            self.scrapeWorker.cancel()
+            for sig, slot in ((self.scrapeWorker.addRow, self.add_row),
+                              (self.scrapeWorker.workFinished, self.scrape_finished),
+                              (self.scrapeWorker.scrapeFailed, self.scrape_failed)):
+                try:
+                    sig.disconnect(slot)
+                except TypeError:
+                    pass
+        return True
+
+    def load_cache(self) -> None:
+        self.cache = ReleaseCache(os.path.join(FixedSettings.config_path, 'releases.json'), self.source_url)
+        releases = self.cache.load()
+        if len(releases):
+            self.model.set_releases(releases)
+            self.view.setCursor(Qt.PointingHandCursor)
+            self.filter_table(text='')
+            self.update_metabar()
+
+    def first_row_shown(self) -> None:
+        if StartupTimer.mark('time-to-first-row') and StartupTimer.enabled:
+            # close rather than quit so the scrape thread is stopped and waited for before teardown
+            QTimer.singleShot(0, self.close)
+
+    @pyqtSlot()
+    def save_cache(self) -> None:
+        self.cache.save(self.model.releases)
+
     @pyqtSlot()
     def about_app(self) -> None:
         about_html = '''<style>
@@ -319,15 +524,61 @@ class TVLinker(QWidget):
 
     @pyqtSlot(int)
     def update_pagecount(self, index: int) -> None:
-        self.dl_pagecount = int(self.dlpages_field.itemText(index))
-        self.scrapeWorker.maxpages = self.dl_pagecount
+        self.dl_autopages = self.dlpages_field.itemText(index) == 'Auto'
+        self.settings.setValue('dl_pagecount', 0 if self.dl_autopages else int(self.dlpages_field.itemText(index)))
+        if self.dl_autopages:
+            # keep what has been loaded and carry on from there as the view scrolls
+            self.model.more_pages = not self.scrape_running() and not self.listing_exhausted()
+            # a running scrape finishes the pages it was started for
+            self.set_pagecount(max(self.fetched_pages(), 2, self.dl_pagecount if self.scrape_running() else 0))
+            return
+        pagecount = int(self.dlpages_field.itemText(index))
+        raised = pagecount > self.dl_pagecount
+        self.set_pagecount(pagecount)
+        if raised and self.scrape_running():
+            # the running scrape reads maxpages before each page and carries on into the extra ones
+            self.scrapeWorker.maxpages = pagecount
+        else:
+            self.stop_scraping()
+            self.trim_pages(pagecount)
+            if self.fetched_pages() < pagecount:
+                self.start_scraping(resume=True)
+        self.update_metabar()
+
+    def set_pagecount(self, pagecount: int) -> None:
+        self.dl_pagecount = pagecount
         self.progress.setMaximum(self.dl_pagecount * self.dl_pagelinks)
-        self.settings.setValue('dl_pagecount', self.dl_pagecount)
         if sys.platform == 'win32':
             self.win_taskbar_button.progress().setMaximum(self.dl_pagecount * self.dl_pagelinks)
-        if self.scrapeThread.isRunning():
-            self.scrapeThread.requestInterruption()
-        self.start_scraping()
+        self.update_metabar()
+
+    def listing_exhausted(self) -> bool:
+        # set by a page that was served without posts, failed pages raise and leave it alone
+        return self.listing_end is not None and self.listing_end < self.fetched_pages()
+
+    @pyqtSlot(int)
+    def listing_ended(self, page: int) -> None:
+        if self.listing_end is None or page < self.listing_end:
+            self.listing_end = page
+
+    @pyqtSlot()
+    def fetch_more_pages(self) -> None:
+        """Scrape one more listing page for a view that has scrolled to within a page of the end."""
+        if not self.dl_autopages:
+            return
+        self.set_pagecount(max(self.dl_pagecount, self.fetched_pages()) + 1)
+        if self.scrape_running():
+            self.scrapeWorker.maxpages = self.dl_pagecount
+        else:
+            self.start_scraping(resume=True)
+
+    def read_ahead(self) -> None:
+        indexes = self.view.visible_indexes()
+        if not len(indexes) or not self.view.model().canFetchMore(QModelIndex()):
+            return
+        last = indexes[-1].parent() if indexes[-1].parent().isValid() else indexes[-1]
+        if self.view.model().rowCount() - last.row() <= self.dl_pagelinks:
+            self.view.model().fetchMore(QModelIndex())
 
     @pyqtSlot()
     def show_progress(self):
@@ -339,63 +590,186 @@ class TVLinker(QWidget):
             self.win_taskbar_button.progress().setVisible(True)
             self.win_taskbar_button.progress().setValue(self.progress.value())
 
-    @pyqtSlot()
-    def scrape_finished(self) -> None:
+    def hide_progress(self) -> None:
         self.progress.hide()
         self.taskbar.setProgress(0.0, False)
         if sys.platform == 'win32':
             self.win_taskbar_button.progress().setVisible(False)
-        self.table.setSortingEnabled(True)
+        self.view.setSortingEnabled(True)
         self.filter_table(text='')
 
-    @pyqtSlot(list)
-    def add_row(self, row: list) -> None:
-        if self.scrapeThread.isInterruptionRequested():
-            self.scrapeThread.terminate()
-        else:
-            self.cols = 0
-            self.table.setRowCount(self.rows + 1)
-            if self.table.cursor() != Qt.PointingHandCursor:
-                self.table.setCursor(Qt.PointingHandCursor)
-            for item in row:
-                table_item = QTableWidgetItem(item)
-                # table_item.setToolTip('%s\n\nDouble-click to view hoster links.' % row[1])
-                table_item.setFont(QFont('Open Sans', weight=QFont.Normal))
-                if self.cols == 2:
-                    if sys.platform == 'win32':
-                        table_item.setFont(QFont('Open Sans Semibold', pointSize=10))
-                    elif sys.platform == 'darwin':
-                        table_item.setFont(QFont('Open Sans Bold', weight=QFont.Bold))
-                    else:
-                        table_item.setFont(QFont('Open Sans', weight=QFont.DemiBold, pointSize=10))
-                    table_item.setText('  ' + table_item.text())
-                elif self.cols in (0, 3):
-                    table_item.setTextAlignment(Qt.AlignCenter)
-                self.table.setItem(self.rows, self.cols, table_item)
-                self.update_metabar()
-                self.cols += 1
+    @pyqtSlot()
+    def scrape_stopped(self) -> None:
+        # a scrape resumed since this one was stopped keeps its progress bar
+        if self.scrape_running() and not sip.isdeleted(self.scrapeWorker) and not self.scrapeWorker.token.cancelled:
+            return
+        self.hide_progress()
+
+    @pyqtSlot()
+    def scrape_finished(self) -> None:
+        # only a refresh that read every requested page can tell which releases are gone
+        if len(self.scraped_urls) and self.fetched_pages() >= self.dl_pagecount:
+            self.model.retain_releases(self.scraped_urls)
+        self.hide_progress()
+        self.prefetch_favorites()
+        if self.dl_autopages and not self.listing_exhausted():
+            self.model.more_pages = True
+            self.read_ahead()
+
+    @pyqtSlot(str)
+    def scrape_failed(self, error: str) -> None:
+        # rows from the cache and the pages fetched so far stay in the table, nothing is pruned
+        self.hide_progress()
+        QMessageBox.warning(self, 'Scrape failed', 'Could not fetch the %s listing, the table shows the '
+                            'releases loaded so far.\n\n%s' % (self.provider, error))
+
+    @pyqtSlot(int, list)
+    def add_row(self, page: int, row: list) -> None:
+        if page >= self.dl_pagecount:
+            # still queued from a scrape stopped when the page count was lowered
+            return
+        self.first_row_shown()
+        if self.view.cursor() != Qt.PointingHandCursor:
+            self.view.setCursor(Qt.PointingHandCursor)
+        with metrics.timer('gui.add_row'):
+            self.scraped_urls.add(row[1])
+            self.page_urls.setdefault(page, set()).add(row[1])
+            self.model.merge_release(row)
             self.rows += 1
+            self.update_metabar()
+
+    @pyqtSlot()
+    def prefetch_visible(self) -> None:
+        self.read_ahead()
+        urls = [self.release_url.format(index.data()) for index in self.view.visible_indexes()]
+        if not len(urls):
+            return
+        self.prefetcher.retain(set(urls), HosterPrefetcher.VISIBLE)
+        for url in urls:
+            self.prefetcher.enqueue(url, HosterPrefetcher.VISIBLE)
+
+    def prefetch_favorites(self) -> None:
+        faves = [normalize(fave) for fave in self.favorites or [] if len(fave)]
+        if len(faves):
+            for row, release in enumerate(self.model.releases):
+                if self.model.matches_favorite(row, faves):
+                    self.prefetcher.enqueue(self.release_url.format(release[1]), HosterPrefetcher.FAVORITE)
+        self.prefetch_timer.start()
+
+    @pyqtSlot()
+    def watch_favorites(self) -> None:
+        if self.watch_running():
+            return
+        # the watcher reads its own snapshot of the settings and cache files from the watch thread
+        self.save_cache()
+        self.settings.sync()
+        if not len(self.watch_scheduler.days):
+            self.watch_scheduler.observe([release[0] for release in self.model.releases])
+        settings = IniSettings(self.settings.fileName())
+        realdebrid = None
+        if len(self.realdebrid_api_token or ''):
+            proxies = ShadowSocks.proxies() if settings.value('realdebrid_apiproxy', False, bool) else {}
+            realdebrid = RealDebridClient(FixedSettings.realdebrid_api_url, self.realdebrid_api_token, proxies)
+        watcher = FavoritesWatcher(Scraper(self.source_url, self.user_agent, self.source_tz), self.cache,
+                                   WatchHistory(os.path.join(FixedSettings.config_path, 'watched.json')),
+                                   list(self.favorites or []), settings, realdebrid, release_url=self.release_url)
+        self.watchThread = WatchThread(watcher, self.watch_scheduler)
+        self.watchThread.releasesFound.connect(self.add_watched)
+        self.watchThread.releasesQueued.connect(self.watch_queued)
+        self.watchThread.downloadLink.connect(self.watch_download)
+        self.watchThread.finished.connect(self.schedule_watch)
+        self.watchThread.finished.connect(self.watchThread.deleteLater)
+        self.watchThread.start()
 
     @pyqtSlot(list)
-    def add_hosters(self, links: list) -> None:
-        self.hosters_win.show_hosters(links)
+    def add_watched(self, rows: list) -> None:
+        for row in rows:
+            self.model.merge_release(row)
+        self.update_metabar()
+
+    @pyqtSlot(list)
+    def watch_queued(self, queued: list) -> None:
+        titles = '\n'.join(title for title, link in queued)
+        if sys.platform.startswith('linux'):
+            self.notify(title='Download added to %s' % self.download_manager, msg=titles,
+                        icon=self.NotifyIcon.SUCCESS)
+        else:
+            QMessageBox.information(self, self.download_manager, 'New episodes have been queued in %s:\n\n%s'
+                                    % (self.download_manager, titles), QMessageBox.Ok)
+
+    @pyqtSlot(str)
+    def watch_download(self, link: str) -> None:
+        self.watch_downloads.append(link)
+        self.next_watch_download()
+
+    @pyqtSlot()
+    def next_watch_download(self) -> None:
+        # one direct download window at a time, the watcher's downloads wait for the one running
+        if not len(self.watch_downloads) or self.download_running():
+            return
+        link = self.watch_downloads.pop(0)
+        thread = DownloadThread(link_url=link, dl_path=os.path.join(download_dir(self.settings),
+                                                                    os.path.basename(link.split('?')[0])))
+        self.start_download(thread)
+
+    def download_running(self) -> bool:
+        return hasattr(self, 'directdl') and not sip.isdeleted(self.directdl) and self.directdl.isRunning()
+
+    def watch_running(self) -> bool:
+        return hasattr(self, 'watchThread') and not sip.isdeleted(self.watchThread) and self.watchThread.isRunning()
+
+    @pyqtSlot(str, list)
+    def add_hosters(self, url: str, releases: list) -> None:
+        if url == self.pending_hosters and not sip.isdeleted(self.hosters_win):
+            self.pending_hosters = None
+            self.open_hosters(releases)
+
+    def open_hosters(self, releases: list) -> None:
+        self.hosters_win.show_hosters(releases)
+        if self.realdebrid_api_token is not None and len(self.realdebrid_api_token) > 0:
+            links = [link for title, mirrors in releases for hoster, link in mirrors]
+            self.linkcheck = RealDebridThread(settings=self.settings, api_url=FixedSettings.realdebrid_api_url,
+                                              link_url=None, action=RealDebridThread.RealDebridAction.CHECK_LINKS,
+                                              links=links)
+            self.linkcheck.linksChecked.connect(self.hosters_win.rank_links)
+            self.linkcheck.start()
 
     @pyqtSlot(QModelIndex)
     def show_hosters(self, index: QModelIndex) -> None:
-        QDesktopServices.openUrl(QUrl('http://scene-rls.net/releases/' + self.table.item(self.table.currentRow(), 1).text()))
-        # qApp.setOverrideCursor(Qt.BusyCursor)
-        # self.hosters_win = HosterLinks(self)
-        # self.hosters_win.downloadLink.connect(self.download_link)
-        # self.hosters_win.copyLink.connect(self.copy_download_link)
-        # self.links = HostersThread(self.table.item(self.table.currentRow(), 1).text(), self.user_agent)
-        # self.links.setHosters.connect(self.add_hosters)
-        # self.links.noLinks.connect(self.no_links)
-        # self.links.start()
+        if index.model().hasChildren(index.sibling(index.row(), 0)):
+            # double clicking an episode group expands it instead
+            return
+        url = self.release_url.format(index.sibling(index.row(), 1).data())
+        qApp.setOverrideCursor(Qt.BusyCursor)
+        self.hosters_win = HosterLinks(self)
+        self.hosters_win.downloadLink.connect(self.download_link)
+        self.hosters_win.downloadRelease.connect(self.download_release)
+        self.hosters_win.copyLink.connect(self.copy_download_link)
+        if url in self.prefetcher.cache:
+            self.open_hosters(self.prefetcher.cache[url])
+        else:
+            self.pending_hosters = url
+            self.prefetcher.enqueue(url, HosterPrefetcher.REQUESTED)
 
-    @pyqtSlot()
-    def no_links(self) -> None:
+    def close_pending_hosters(self, url: str) -> bool:
+        if url != self.pending_hosters or sip.isdeleted(self.hosters_win):
+            return False
+        self.pending_hosters = None
+        qApp.restoreOverrideCursor()
         self.hosters_win.loading_progress.cancel()
         self.hosters_win.close()
+        return True
+
+    @pyqtSlot(str, str)
+    def hosters_failed(self, url: str, error: str) -> None:
+        if self.close_pending_hosters(url):
+            QMessageBox.warning(self, 'Links Unavailable', 'Could not fetch the links of the chosen TV show, '
+                                'please try again shortly.\n\n%s' % error)
+
+    @pyqtSlot(str)
+    def no_links(self, url: str) -> None:
+        if not self.close_pending_hosters(url):
+            return
         QMessageBox.warning(self, 'No Links Available', 'No links are available yet for the chosen TV show. ' +
                             'This is most likely due to the files still being uploaded. This is normal if the ' +
                             'link was published 30-45 mins ago.\n\nPlease check back again in 10-15 minutes.')
@@ -410,27 +784,34 @@ class TVLinker(QWidget):
     @pyqtSlot(str)
     @pyqtSlot()
     def filter_table(self, text: str='') -> None:
-        filters = []
+        favorites = []
+        text, ranges, fields = parse_query(text)
         if self.favorites_button.isChecked():
-            filters = self.favorites
-            self.table.sortItems(2, Qt.AscendingOrder)
+            favorites = list(self.favorites or [])
+            self.view.sortByColumn(2, Qt.AscendingOrder)
         else:
-            self.table.sortItems(0,Qt.DescendingOrder)
-        if len(text):
-            filters.append(text)
-        if not len(filters) or not hasattr(self, 'valid_rows'):
-            self.valid_rows = []
-        for search_term in filters:
-            for item in self.table.findItems(search_term, Qt.MatchContains):
-                self.valid_rows.append(item.row())
-        for row in range(0, self.table.rowCount()):
-            if not len(filters):
-                self.table.showRow(row)
-            else:
-                if row not in self.valid_rows:
-                    self.table.hideRow(row)
-                else:
-                    self.table.showRow(row)
+            self.view.sortByColumn(0, Qt.DescendingOrder)
+        self.proxy.set_filters([text], ranges, fields, favorites)
+
+    @pyqtSlot(bool)
+    def group_episodes(self, checked: bool) -> None:
+        self.settings.setValue('group_episodes', checked)
+        if checked and self.tree is None:
+            self.groups = EpisodeGroupModel(self.model, self)
+            self.tree = TVLinkerTree(self.proxy, self)
+            self.tree.doubleClicked.connect(self.show_hosters)
+            self.tree.verticalScrollBar().valueChanged.connect(self.prefetch_timer.start)
+            self.tree.setCursor(self.table.cursor())
+            self.layout().insertWidget(self.layout().indexOf(self.table) + 1, self.tree)
+        elif self.tree is None:
+            return
+        sorting = self.view.isSortingEnabled()
+        self.proxy.setSourceModel(self.groups if checked else self.model)
+        self.view = self.tree if checked else self.table
+        self.table.setVisible(not checked)
+        self.tree.setVisible(checked)
+        self.view.setSortingEnabled(sorting)
+        self.filter_table(self.search_field.text())
 
     @pyqtSlot()
     def clear_filters(self):
@@ -505,22 +886,43 @@ class TVLinker(QWidget):
             else:
                 dlpath, _ = QFileDialog.getSaveFileName(self, 'Save File', link.split('/')[-1])
                 if dlpath != '':
-                    self.directdl_win = DirectDownload(parent=self)
-                    self.directdl = DownloadThread(link_url=link, dl_path=dlpath)
-                    self.directdl.dlComplete.connect(self.directdl_win.download_complete)
-                    if sys.platform.startswith('linux'):
-                        self.directdl.dlComplete.connect(lambda: self.notify(qApp.applicationName(),
+                    self.start_download(DownloadThread(link_url=link, dl_path=dlpath))
+
+    @pyqtSlot(list)
+    def download_release(self, links: list) -> None:
+        if self.download_manager != 'built-in':
+            self.download_link(links[0])
+            return
+        dlpath, _ = QFileDialog.getSaveFileName(self, 'Save File', links[0].split('/')[-1])
+        if dlpath != '':
+            self.start_download(FailoverDownloadThread(mirrors=links, dl_path=dlpath, settings=self.settings,
+                                                       api_url=FixedSettings.realdebrid_api_url,
+                                                       min_speed=self.settings.value('failover_min_speed',
+                                                                                     100, int) * 1024))
+
+    def start_download(self, thread: DownloadThread) -> None:
+        self.directdl_win = DirectDownload(parent=self)
+        self.directdl = thread
+        self.directdl.dlComplete.connect(self.directdl_win.download_complete)
+        if sys.platform.startswith('linux'):
+            self.directdl.dlComplete.connect(lambda: self.notify(qApp.applicationName(),
+                                                                 'Download complete',
+                                                                 self.NotifyIcon.SUCCESS))
+        else:
+            self.directdl.dlComplete.connect(lambda: QMessageBox.information(self, qApp.applicationName(),
                                                                              'Download complete',
-                                                                             self.NotifyIcon.SUCCESS))
-                    else:
-                        self.directdl.dlComplete.connect(lambda: QMessageBox.information(self, qApp.applicationName(),
-                                                                                         'Download complete',
-                                                                                         QMessageBox.Ok))
-                    self.directdl.dlProgressTxt.connect(self.directdl_win.update_progress_label)
-                    self.directdl.dlProgress.connect(self.directdl_win.update_progress)
-                    self.directdl_win.cancelDownload.connect(self.cancel_download)
-                    self.directdl.start()
-                    self.hosters_win.close()
+                                                                             QMessageBox.Ok))
+        self.directdl.dlFailed.connect(self.directdl_win.download_complete)
+        self.directdl.dlFailed.connect(lambda link: self.error_handler([
+            'DOWNLOAD ERROR', '<h3>Download failed</h3>Could not download from any of the available links.'
+            '<br/><br/>%s' % link]))
+        self.directdl.dlProgressTxt.connect(self.directdl_win.update_progress_label)
+        self.directdl.dlProgress.connect(self.directdl_win.update_progress)
+        self.directdl_win.cancelDownload.connect(self.cancel_download)
+        self.directdl.finished.connect(self.next_watch_download)
+        self.directdl.start()
+        if hasattr(self, 'hosters_win') and not sip.isdeleted(self.hosters_win):
+            self.hosters_win.close()
 
     def _init_notification_icons(self):
         for icon in self.NotifyIcon:
@@ -528,6 +930,7 @@ class TVLinker(QWidget):
             icon_file.save(os.path.join(FixedSettings.config_path, os.path.basename(icon.value)), 'PNG', 100)
 
     def notify(self, title: str, msg: str = '', icon: Enum = None, urgency: int = 1) -> bool:
+        import tvlinker.notify as notify
         icon_path = icon.value if icon is not None else self.NotifyIcon.DEFAULT.value
         icon_path = os.path.join(FixedSettings.config_path, os.path.basename(icon_path))
         if not os.path.exists(icon_path):
@@ -582,10 +985,16 @@ class TVLinker(QWidget):
         self.realdebrid.start()
 
     def closeEvent(self, event: QCloseEvent) -> None:
-        if hasattr(self, 'scrapeThread'):
-            if not sip.isdeleted(self.scrapeThread) and self.scrapeThread.isRunning():
-                self.scrapeThread.requestInterruption()
-                self.scrapeThread.quit()
+        if self.stop_scraping():
+            self.scrapeThread.wait(Scraper.timeout[0] * 1000)
+        self.watch_timer.stop()
+        self.watch_downloads = []
+        if self.watch_running():
+            self.watchThread.watcher.cancel()
+            self.watchThread.wait(Scraper.timeout[0] * 1000)
+        if self.download_running():
+            self.directdl.cancel_download = True
+            self.directdl.wait(Scraper.timeout[0] * 1000)
         qApp.quit()
 
     def error_handler(self, props: list) -> None:
@@ -600,6 +1009,12 @@ class TVLinker(QWidget):
             return os.path.join(QFileInfo(__file__).absolutePath(), path)
         return ':assets/%s' % path
 
+    @staticmethod
+    def register_resources() -> None:
+        # the binary bundle is memory-mapped by Qt, the generated module is only a fallback
+        if not QResource.registerResource(TVLinker.get_path('assets.rcc', override=True)):
+            import tvlinker.assets
+
     @staticmethod
     def get_version(filename: str = '__init__.py') -> str:
         with open(TVLinker.get_path(filename, override=True), 'r') as initfile:
@@ -624,6 +1039,9 @@ class FixedSettings:
     linksPerPage = 20
     latest_release_url = 'https://github.com/ozmartian/tvlinker/releases/latest'
     realdebrid_api_url = 'https://api.real-debrid.com/rest/1.0'
+    prefetchThreads = 3
+    prefetchQueueSize = 60
+    prefetchCacheSize = 300
     config_path = None
 
     @staticmethod
@@ -644,8 +1062,18 @@ def main():
     app.setOrganizationDomain(FixedSettings.organizationDomain)
     app.setApplicationVersion(FixedSettings.applicationVersion)
     app.setQuitOnLastWindowClosed(True)
-    tvlinker = TVLinker(FixedSettings.get_app_settings())
-    sys.exit(app.exec_())
+    # the default settings file is copied out of the resources on first run
+    TVLinker.register_resources()
+    settings = FixedSettings.get_app_settings()
+    if os.getenv(LOG_ENV):
+        metrics.enable_log(os.path.join(FixedSettings.config_path, 'metrics.jsonl'))
+    # --profile or --profile=sample on the command line, or TVLINKER_PROFILE in the environment
+    flag = next((arg.partition('=')[2] or 'cprofile' for arg in sys.argv[1:] if arg.startswith('--profile')), None)
+    Profiler.configure_from_env(FixedSettings.config_path, flag)
+    tvlinker = TVLinker(settings)
+    with Profiler.session('gui'):
+        exit_code = app.exec_()
+    sys.exit(exit_code)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+
+try:
+    # noinspection PyPackageRequirements
+    import simplejson as json
+except ImportError:
+    import json
+
+
+class ReleaseCache:
+    version = 3
+    # the window and the favorites watcher thread write the same file
+    lock = threading.RLock()
+
+    def __init__(self, path: str, source_url: str):
+        self.path = path
+        self.source_url = source_url
+
+    def load(self) -> list:
+        if not os.path.isfile(self.path):
+            return []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as cachefile:
+                cache = json.load(cachefile)
+        except (OSError, ValueError):
+            return []
+        if cache.get('version') != self.version or cache.get('source') != self.source_url:
+            return []
+        return cache.get('releases', [])
+
+    def save(self, releases: list) -> None:
+        cache = {
+            'version': self.version,
+            'source': self.source_url,
+            'releases': releases
+        }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # per process, so the desktop app and tvlinker-cli never write each other's temporary file
+        tmpfile = '%s.%i.tmp' % (self.path, os.getpid())
+        with ReleaseCache.lock:
+            with open(tmpfile, 'w', encoding='utf-8') as cachefile:
+                json.dump(cache, cachefile)
+            os.replace(tmpfile, self.path)
+
+    def merge(self, rows: list) -> list:
+        """Add rows not cached yet in front of the cached ones and return them."""
+        with ReleaseCache.lock:
+            releases = self.load()
+            known = {release[1] for release in releases}
+            added = [row for row in rows if row[1] not in known]
+            if len(added):
+                self.save(added + releases)
+        return added
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import os
+import sys
+import time
+
+from tvlinker import __version__
+from tvlinker.cache import ReleaseCache
+from tvlinker.core.config import IniSettings, config_path
+from tvlinker.core.managers import hand_off
+from tvlinker.core.metrics import LOG_ENV, metrics
+from tvlinker.core.profiling import MODES, Profiler
+from tvlinker.core.proxies import ShadowSocks
+from tvlinker.core.realdebrid import API_URL, RealDebridClient
+from tvlinker.core.schedule import PollScheduler
+from tvlinker.core.scraper import RELEASE_URL, SOURCE_URL, Scraper
+from tvlinker.core.watcher import FavoritesWatcher, WatchHistory
+from tvlinker.filesize import format_size
+from tvlinker.filters import filter_releases
+from tvlinker.timestamps import SOURCE_TIMEZONE, format_timestamp
+
+try:
+    # noinspection PyPackageRequirements
+    import simplejson as json
+except ImportError:
+    import json
+
+
+class TVLinkerCLI:
+    managers = ('built-in', 'aria2', 'pyload', 'kget', 'persepolis', 'print')
+
+    def __init__(self, settings: IniSettings, cache_path: str):
+        self.settings = settings
+        self.cache = ReleaseCache(cache_path, SOURCE_URL)
+        self.scraper = Scraper(SOURCE_URL, settings.value('user_agent'),
+                               settings.value('source_timezone', SOURCE_TIMEZONE))
+
+    def scrape(self, pages: int) -> list:
+        """Scrape the first pages of the listing and merge them into the release cache, newest first."""
+        releases = {release[1]: release for release in self.cache.load()}
+        self.scraper.reset()
+        for page in range(pages):
+            for row in self.scraper.scrape_page(page):
+                releases[row[1]] = row
+        merged = sorted(releases.values(), key=lambda release: release[0], reverse=True)
+        self.cache.save(merged)
+        return merged
+
+    def watcher(self) -> FavoritesWatcher:
+        history = WatchHistory(os.path.join(os.path.dirname(self.cache.path), 'watched.json'))
+        return FavoritesWatcher(self.scraper, self.cache, history, self.settings.value('favorites', [], list),
+                                self.settings, self.realdebrid())
+
+    def realdebrid(self) -> RealDebridClient:
+        token = self.settings.value('realdebrid_apitoken') or ''
+        if not len(token):
+            return None
+        proxies = ShadowSocks.proxies() if self.settings.value('realdebrid_apiproxy', False, bool) else {}
+        return RealDebridClient(API_URL, token, proxies)
+
+    def unrestrict(self, link: str) -> str:
+        client = self.realdebrid()
+        if client is None or RealDebridClient.is_unrestricted(link):
+            return link
+        return client.unrestrict(link).get('download')
+
+    @staticmethod
+    def show_progress(downloaded: int, filesize: int, speed: float) -> None:
+        sys.stderr.write('\r%s of %s [%s/s]    ' % (format_size(downloaded), format_size(filesize), format_size(speed)))
+        if filesize and downloaded >= filesize:
+            sys.stderr.write('\n')
+
+    @staticmethod
+    def print_releases(releases: list, as_json: bool = False) -> None:
+        if as_json:
+            json.dump(releases, sys.stdout)
+            sys.stdout.write('\n')
+            return
+        for posted, url, title, dlsize in releases:
+            print('%s\t%9s\t%s\t%s' % (format_timestamp(posted), format_size(dlsize) if dlsize else '', title,
+                                       RELEASE_URL.format(url)))
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='tvlinker-cli', description='Scrape Scene-RLS TV releases, unrestrict '
+                                     'hoster links through Real-Debrid and queue them without the desktop app.')
+    parser.add_argument('--version', action='version', version='%(prog)s ' + __version__)
+    parser.add_argument('--config', metavar='INI', help='settings file, defaults to the one the desktop app uses')
+    parser.add_argument('--profile', nargs='?', const='cprofile', choices=MODES,
+                        help='profile the command, writing pstats or speedscope files to the profiles directory '
+                        'next to the settings')
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+    releases = commands.add_parser('list', help='scrape the latest releases')
+    releases.add_argument('--pages', type=int, help='listing pages to scrape, defaults to the dl_pagecount setting')
+    releases.add_argument('--offline', action='store_true', help='list the cached releases without scraping')
+    releases.add_argument('--json', action='store_true', help='print the releases as JSON')
+    releases.add_argument('query', nargs='*', help='search terms, e.g. size:500mb-2gb age:<6h res:720p')
+    links = commands.add_parser('links', help='print the hoster links of a release post')
+    links.add_argument('url', help='release post URL as printed by list')
+    download = commands.add_parser('download', help='unrestrict a hoster link and hand it to a download manager')
+    download.add_argument('link', help='hoster link')
+    download.add_argument('--manager', choices=TVLinkerCLI.managers,
+                          help='download manager, defaults to the download_manager setting')
+    download.add_argument('--output', metavar='PATH', help='target file for the built-in downloader')
+    watch = commands.add_parser('watch', help='poll for new episodes of favorites and queue them for download')
+    watch.add_argument('--interval', type=float, metavar='MINUTES',
+                       help='minutes between polls at the average posting rate, defaults to the watch_interval '
+                       'setting')
+    watch.add_argument('--fixed', action='store_true',
+                       help='always wait the full interval instead of following the posting rate')
+    watch.add_argument('--once', action='store_true', help='poll a single time, e.g. when run from cron')
+    return parser
+
+
+def main(argv: list = None) -> int:
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 2
+    settings = IniSettings(args.config)
+    if os.getenv(LOG_ENV):
+        metrics.enable_log(os.path.join(config_path(), 'metrics.jsonl'))
+    Profiler.configure_from_env(config_path(), args.profile)
+    with Profiler.session('cli-%s' % args.command):
+        return run(args, settings)
+
+
+def run(args: argparse.Namespace, settings: IniSettings) -> int:
+    cli = TVLinkerCLI(settings, os.path.join(config_path(), 'releases.json'))
+    if args.command == 'list':
+        if args.offline:
+            releases = sorted(cli.cache.load(), key=lambda release: release[0], reverse=True)
+        else:
+            # a dl_pagecount of 0 is the desktop app's Auto, which has no view to scroll here
+            releases = cli.scrape(args.pages or settings.value('dl_pagecount', 10, int) or 10)
+        cli.print_releases(filter_releases(releases, ' '.join(args.query)), args.json)
+    elif args.command == 'links':
+        url = args.url if args.url.startswith('http') else RELEASE_URL.format(args.url)
+        for title, mirrors in cli.scraper.get_hosters(url):
+            print(title)
+            for hoster, link in mirrors:
+                print('\t%s\t%s' % (hoster, link))
+    elif args.command == 'download':
+        link = cli.unrestrict(args.link)
+        if link is None:
+            sys.stderr.write('Real-Debrid could not unrestrict %s\n' % args.link)
+            return 1
+        manager = (args.manager or settings.value('download_manager', 'built-in')).lower()
+        if manager not in TVLinkerCLI.managers:
+            sys.stderr.write('%s is not available from the command line\n' % manager)
+            return 1
+        if not hand_off(link, manager, settings, args.output, TVLinkerCLI.show_progress):
+            sys.stderr.write('%s could not take %s\n' % (manager, link))
+            return 1
+    elif args.command == 'watch':
+        watcher = cli.watcher()
+        interval = int((args.interval or settings.value('watch_interval', 15, int)) * 60)
+        scheduler = PollScheduler(interval)
+        scheduler.observe([release[0] for release in cli.cache.load()])
+        while True:
+            try:
+                rows, queued = watcher.poll()
+                scheduler.record([row[0] for row in rows])
+            except Exception as e:
+                # a failed poll is retried on the next round rather than ending the daemon
+                sys.stderr.write('poll failed: %s\n' % e)
+                scheduler.record_error()
+                rows, queued = [], []
+            for title, link in queued:
+                print('queued %s\t%s' % (title, link), flush=True)
+            if args.once:
+                break
+            time.sleep(interval if args.fixed else scheduler.next_interval())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
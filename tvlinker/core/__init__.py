@@ -0,0 +1,4 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Qt free scraping, Real-Debrid and download manager code, shared by the GUI threads and tvlinker-cli
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+
+
+class Cancelled(Exception):
+    pass
+
+
+class CancelToken:
+    """Cooperative cancellation shared between the thread doing the work and the one stopping it.
+
+    Workers call check() between units of work; cancel() also runs the registered callbacks, e.g. closing the
+    session a request is waiting on, from the cancelling thread.
+
+    >>> token = CancelToken()
+    >>> closed = []
+    >>> token.on_cancel(lambda: closed.append(True))
+    >>> token.check()
+    >>> token.cancel()
+    >>> token.cancelled, closed
+    (True, [True])
+    >>> token.check()  # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+    ...
+    Cancelled
+
+    """
+    def __init__(self):
+        self.event = threading.Event()
+        self.callbacks = []
+        self.lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.event.is_set()
+
+    def on_cancel(self, callback) -> None:
+        with self.lock:
+            if not self.cancelled:
+                self.callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self) -> None:
+        with self.lock:
+            if self.cancelled:
+                return
+            self.event.set()
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise Cancelled
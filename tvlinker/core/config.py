@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+from configparser import ConfigParser
+
+APP_NAME = 'TVLinker'
+
+
+def config_path() -> str:
+    """The directory QStandardPaths.AppConfigLocation resolves to for the desktop app."""
+    if sys.platform == 'win32':
+        base = os.getenv('LOCALAPPDATA', os.path.expanduser('~\\AppData\\Local'))
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Preferences')
+    else:
+        base = os.getenv('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    return os.path.join(base, APP_NAME)
+
+
+class IniSettings:
+    """Read-only view of the desktop app's tvlinker.ini answering value() like QSettings does."""
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(config_path(), '%s.ini' % APP_NAME.lower())
+        self.parser = ConfigParser(interpolation=None)
+        self.parser.optionxform = str
+        if os.path.isfile(self.path):
+            self.parser.read(self.path, encoding='utf-8')
+
+    def value(self, key: str, default=None, type=None):
+        raw = self.parser.get('General', key, fallback=None)
+        if raw is None:
+            return default
+        raw = raw.strip()
+        if len(raw) > 1 and raw[0] == raw[-1] == '"':
+            raw = raw[1:-1]
+        raw = raw.replace('\\\\', '\\')
+        if type is bool:
+            return raw.lower() in ('true', '1')
+        elif type is int:
+            try:
+                return int(raw)
+            except ValueError:
+                return default
+        elif type is list:
+            return [item.strip() for item in raw.split(',') if len(item.strip())]
+        return raw
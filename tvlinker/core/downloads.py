@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import time
+
+# observed throughput in bytes/sec per hoster, used to rank mirrors
+hoster_speeds = {}
+
+
+class Transfer:
+    speed_window = 5
+    speed_grace = 15
+
+    def __init__(self, dl_path: str, proxies: dict = None):
+        self.download_path = dl_path
+        self.proxies = proxies or {}
+        self.cancelled = False
+        self.filesize = 0
+        self.downloaded = 0
+
+    def fetch(self, link: str, min_speed: int = 0, hoster: str = None, progress=None) -> str:
+        """Stream link to the download path, resuming from what is already on disk when the
+        server honours the byte range and reports the same total size.
+
+        progress is called with (downloaded, filesize, bytes per second) after every chunk.
+        Returns one of 'complete', 'cancelled', 'slow' or 'error'.
+        """
+        import requests
+        headers = {'Range': 'bytes=%i-' % self.downloaded} if self.downloaded else {}
+        try:
+            req = requests.get(link, stream=True, proxies=self.proxies, headers=headers, timeout=30)
+            req.raise_for_status()
+        except requests.RequestException:
+            return 'error'
+        if req.status_code == 206:
+            total = req.headers.get('Content-Range', '').rsplit('/', 1)[-1]
+            total = int(total) if total.isdigit() else 0
+        else:
+            total = int(req.headers.get('Content-Length', 0))
+        if req.status_code != 206 or total != self.filesize:
+            self.downloaded = 0
+        self.filesize = total
+        start = window_start = time.perf_counter()
+        received, window_bytes = 0, 0
+        with open(self.download_path, 'r+b' if self.downloaded else 'wb') as f:
+            f.seek(self.downloaded)
+            f.truncate()
+            try:
+                for chunk in req.iter_content(chunk_size=8192):
+                    if self.cancelled or not chunk:
+                        req.close()
+                        break
+                    f.write(chunk)
+                    self.downloaded += len(chunk)
+                    received += len(chunk)
+                    window_bytes += len(chunk)
+                    now = time.perf_counter()
+                    if progress is not None:
+                        progress(self.downloaded, self.filesize, received / (now - start) if now > start else 0)
+                    if now - window_start >= self.speed_window:
+                        if hoster is not None:
+                            hoster_speeds[hoster] = received / (now - start)
+                        if min_speed and now - start >= self.speed_grace and \
+                                window_bytes / (now - window_start) < min_speed:
+                            req.close()
+                            return 'slow'
+                        window_start, window_bytes = now, 0
+            except requests.RequestException:
+                return 'error'
+        if self.cancelled:
+            return 'cancelled'
+        if self.filesize and self.downloaded < self.filesize:
+            return 'error'
+        return 'complete'
+
+    @property
+    def filename(self) -> str:
+        return os.path.basename(self.download_path)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import shlex
+import subprocess
+from http.client import HTTPException
+from urllib.request import Request, urlopen
+
+from tvlinker.core.downloads import Transfer
+from tvlinker.core.proxies import ShadowSocks
+from tvlinker.pyload import PyloadConnection
+
+try:
+    # noinspection PyPackageRequirements
+    import simplejson as json
+except ImportError:
+    import json
+
+
+def aria2_add_uri(link: str, rpc_host: str, rpc_port: str, rpc_secret: str = '', rpc_username: str = '',
+                  rpc_password: str = '') -> bool:
+    """Queue link with an aria2 RPC daemon, returning whether aria2 accepted it."""
+    user, passwd = '', ''
+    if len(rpc_username or '') > 0 and len(rpc_password or '') > 0:
+        user = rpc_username
+        passwd = rpc_password
+    elif len(rpc_secret or '') > 0:
+        user = 'token'
+        passwd = rpc_secret
+    aria2_endpoint = '%s:%s/jsonrpc' % (rpc_host, rpc_port)
+    headers = {'Content-Type': 'application/json'}
+    payload = json.dumps(
+        {
+            'jsonrpc': '2.0',
+            'id': 1,
+            'method': 'aria2.addUri',
+            'params': ['%s:%s' % (user, passwd), [link]]
+        },
+        sort_keys=False).encode('utf-8')
+    try:
+        req = Request(aria2_endpoint, headers=headers, data=payload)
+        jsonres = json.loads(urlopen(req).read().decode('utf-8'))
+    except (OSError, ValueError, HTTPException):
+        # a reply cut off mid-body raises IncompleteRead, which is not an OSError
+        return False
+    return 'result' in jsonres.keys()
+
+
+def pyload_add_package(links: list, host: str, username: str, password: str, name: str = 'TVLinker') -> int:
+    conn = PyloadConnection(host, username, password)
+    return conn.addPackage(name=name, links=links)
+
+
+def command_add(cmd: str, link: str) -> bool:
+    """Hand link to a download manager command line such as KGet or Persepolis."""
+    try:
+        subprocess.Popen(shlex.split(cmd) + [link], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except OSError:
+        return False
+    return True
+
+
+def download_dir(settings) -> str:
+    return settings.value('download_path') or os.path.join(os.path.expanduser('~'), 'Downloads')
+
+
+def hand_off(link: str, manager: str, settings, dl_path: str = None, progress=None) -> bool:
+    """Queue an unrestricted link with the named download manager, configured from settings.
+
+    The built-in manager downloads in the calling thread, to dl_path or the download directory.
+    """
+    manager = (manager or 'built-in').lower()
+    if manager == 'print':
+        print(link)
+        return True
+    elif manager == 'aria2':
+        return aria2_add_uri(link, settings.value('aria2_rpc_host'), settings.value('aria2_rpc_port'),
+                             settings.value('aria2_rpc_secret'), settings.value('aria2_rpc_username'),
+                             settings.value('aria2_rpc_password'))
+    elif manager == 'pyload':
+        pyload_add_package([link], settings.value('pyload_host'), settings.value('pyload_username'),
+                           settings.value('pyload_password'))
+        return True
+    elif manager in ('kget', 'persepolis'):
+        return command_add(settings.value('%s_cmd' % manager), link)
+    elif manager != 'built-in':
+        return False
+    if dl_path is None:
+        dl_path = os.path.join(download_dir(settings), os.path.basename(link.split('?')[0]))
+    return Transfer(dl_path, ShadowSocks.proxies()).fetch(link, progress=progress) == 'complete'
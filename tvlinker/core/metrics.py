@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import logging.handlers
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    # noinspection PyPackageRequirements
+    import simplejson as json
+except ImportError:
+    import json
+
+# setting TVLINKER_METRICS writes every sample to metrics.jsonl in the config directory
+LOG_ENV = 'TVLINKER_METRICS'
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of values.
+
+    >>> percentile([5, 1, 4, 2, 3], 50)
+    3
+    >>> percentile(list(range(1, 101)), 95)
+    95
+    >>> percentile([], 50)
+    0.0
+
+    """
+    if not len(values):
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+class Metrics:
+    """Per stage timings and counters, kept in memory for percentiles and optionally logged as JSON lines.
+
+    >>> metrics = Metrics()
+    >>> for ms in (10, 20, 30, 40):
+    ...     metrics.record('parse', ms)
+    >>> metrics.count('rows', 3)
+    >>> with metrics.timer('fetch', page=1) as fields:
+    ...     fields['status'] = 200
+    >>> stats = metrics.summary()
+    >>> stats['parse']['count'], stats['parse']['p50'], stats['parse']['p95']
+    (4, 20, 40)
+    >>> stats['fetch']['count'], metrics.counters['rows']
+    (1, 3)
+
+    """
+    samples = 500
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = {}
+        self.totals = {}
+        self.counters = {}
+        self.log = None
+
+    def enable_log(self, path: str, max_bytes: int = 1024 * 1024, backups: int = 3) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                       encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self.log = logging.getLogger('tvlinker.metrics')
+        self.log.propagate = False
+        self.log.setLevel(logging.INFO)
+        self.log.addHandler(handler)
+
+    def write(self, entry: dict) -> None:
+        if self.log is not None:
+            entry['ts'] = round(time.time(), 3)
+            entry['thread'] = threading.current_thread().name
+            self.log.info(json.dumps(entry, sort_keys=True))
+
+    def record(self, stage: str, ms: float, **fields) -> None:
+        with self.lock:
+            if stage not in self.timings:
+                self.timings[stage] = deque(maxlen=self.samples)
+                self.totals[stage] = [0, 0.0]
+            self.timings[stage].append(ms)
+            self.totals[stage][0] += 1
+            self.totals[stage][1] += ms
+        if self.log is not None:
+            fields.update(stage=stage, ms=round(ms, 3))
+            self.write(fields)
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        if self.log is not None:
+            self.write({'counter': name, 'value': value})
+
+    @contextmanager
+    def timer(self, stage: str, **fields):
+        """Time the with block as stage; fields, which the block may add to, only go to the log."""
+        started = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            self.record(stage, (time.perf_counter() - started) * 1000, **fields)
+
+    def summary(self) -> dict:
+        """{stage: {count, total, p50, p95}} in milliseconds, percentiles over the latest samples."""
+        with self.lock:
+            timings = {stage: list(values) for stage, values in self.timings.items()}
+            totals = {stage: tuple(total) for stage, total in self.totals.items()}
+        return {stage: {'count': totals[stage][0], 'total': totals[stage][1],
+                        'p50': percentile(values, 50), 'p95': percentile(values, 95)}
+                for stage, values in timings.items()}
+
+    def reset(self) -> None:
+        with self.lock:
+            self.timings.clear()
+            self.totals.clear()
+            self.counters.clear()
+
+
+metrics = Metrics()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import cProfile
+import functools
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    # noinspection PyPackageRequirements
+    import simplejson as json
+except ImportError:
+    import json
+
+# TVLINKER_PROFILE=cprofile writes a .pstats file per profiled session, =sample a speedscope .json
+PROFILE_ENV = 'TVLINKER_PROFILE'
+MODES = ('cprofile', 'sample')
+
+
+class Sampler(threading.Thread):
+    """Samples the stacks of registered threads at a fixed interval, for the sampling profile mode."""
+
+    def __init__(self, interval: float = 0.005):
+        super(Sampler, self).__init__(name='profiler-sampler', daemon=True)
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.threads = {}
+
+    def register(self, ident: int) -> list:
+        samples = []
+        with self.lock:
+            self.threads[ident] = samples
+        return samples
+
+    def unregister(self, ident: int) -> None:
+        with self.lock:
+            self.threads.pop(ident, None)
+
+    def run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self.lock:
+                for ident, samples in self.threads.items():
+                    frame = frames.get(ident)
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                        frame = frame.f_back
+                    if len(stack):
+                        samples.append(tuple(reversed(stack)))
+
+
+def speedscope(name: str, samples: list, interval: float) -> dict:
+    """A speedscope sampled profile of samples, each a root first tuple of (function, file, line) frames.
+
+    >>> doc = speedscope('scrape', [(('main', 'a.py', 1), ('get', 'b.py', 9)), (('main', 'a.py', 1),)], 0.005)
+    >>> [frame['name'] for frame in doc['shared']['frames']], doc['profiles'][0]['samples']
+    (['main', 'get'], [[0, 1], [0]])
+    >>> doc['profiles'][0]['endValue']
+    0.01
+
+    """
+    frames, index = [], {}
+    stacks = []
+    for sample in samples:
+        stack = []
+        for frame in sample:
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+            stack.append(index[frame])
+        stacks.append(stack)
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'tvlinker',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'seconds',
+            'startValue': 0,
+            'endValue': round(len(stacks) * interval, 6),
+            'samples': stacks,
+            'weights': [interval] * len(stacks)
+        }]
+    }
+
+
+class Profiler:
+    """Opt-in per thread profiling of the scrape, download and GUI event loop sessions.
+
+    Profilers only see the thread they run in, so every QThread profiles its own run and dumps its own file
+    to the profile directory, named after the session, thread and start time.
+
+    >>> import tempfile
+    >>> Profiler.configure('cprofile', tempfile.mkdtemp())
+    >>> with Profiler.session('demo'):
+    ...     total = sum(range(1000))
+    >>> with Profiler.session('outer'):
+    ...     with Profiler.session('inner'):
+    ...         total = sum(range(1000))
+    >>> sorted(name.split('-')[0] for name in os.listdir(Profiler.directory))
+    ['demo', 'inner', 'outer']
+    >>> Profiler.configure(None)
+
+    """
+    mode = None
+    directory = None
+    sampler = None
+    lock = threading.Lock()
+
+    @staticmethod
+    def configure(mode: str, directory: str = None) -> None:
+        if mode is not None and mode not in MODES:
+            # any other value of the env var, e.g. 1, means the deterministic profiler
+            mode = 'cprofile'
+        Profiler.mode = mode
+        Profiler.directory = directory
+        if mode == 'sample':
+            Profiler.start_sampler()
+
+    @staticmethod
+    def configure_from_env(directory: str, flag: str = None) -> None:
+        mode = flag or os.getenv(PROFILE_ENV)
+        if mode:
+            Profiler.configure(mode, os.path.join(directory, 'profiles'))
+
+    @staticmethod
+    def start_sampler() -> Sampler:
+        with Profiler.lock:
+            if Profiler.sampler is None:
+                Profiler.sampler = Sampler()
+                Profiler.sampler.start()
+        return Profiler.sampler
+
+    @staticmethod
+    def path(name: str, extension: str) -> str:
+        os.makedirs(Profiler.directory, exist_ok=True)
+        return os.path.join(Profiler.directory, '%s-%s-%s.%s' % (name, threading.current_thread().name.replace(' ', '_'),
+                                                                 time.strftime('%Y%m%d-%H%M%S'), extension))
+
+    @staticmethod
+    def dump(name: str, extension: str, write) -> None:
+        # runs at the end of profiled slots and thread runs, where an exception would abort the app
+        try:
+            write(Profiler.path(name, extension))
+        except (OSError, TypeError, ValueError) as e:
+            sys.stderr.write('could not write the %s profile: %s\n' % (name, e))
+
+    @staticmethod
+    def write_speedscope(name: str, samples: list, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(speedscope(name, samples, Profiler.sampler.interval), f)
+
+    @staticmethod
+    @contextmanager
+    def session(name: str):
+        mode = Profiler.mode
+        if mode == 'cprofile':
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                # from Python 3.12 only one cProfile can be active per process, the GUI loop's session usually
+                sys.stderr.write('sampling the %s session instead: %s\n' % (name, e))
+                mode = 'sample'
+            else:
+                try:
+                    yield
+                finally:
+                    profile.disable()
+                    Profiler.dump(name, 'pstats', profile.dump_stats)
+                return
+        if mode == 'sample':
+            ident = threading.get_ident()
+            samples = Profiler.start_sampler().register(ident)
+            try:
+                yield
+            finally:
+                Profiler.sampler.unregister(ident)
+                Profiler.dump(name, 'speedscope.json', lambda path: Profiler.write_speedscope(name, samples, path))
+        else:
+            yield
+
+
+def profiled(name: str):
+    """Decorator running the function inside a Profiler session."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if Profiler.mode is None:
+                return func(*args, **kwargs)
+            with Profiler.session(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
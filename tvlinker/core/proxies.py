@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+
+class ShadowSocks:
+    config = {
+        'ssocks': {
+            'procs': ['ss-qt5', 'sslocal'],
+            'proxies': {
+                'http': 'socks5://127.0.0.1:1080',
+                'https': 'socks5://127.0.0.1:1080'
+            },
+        },
+        'v2ray': {
+            'procs': ['v2ray'],
+            'proxies': {
+                'http': 'socks5://127.0.0.1:10808',
+                'https': 'socks5://127.0.0.1:10808'
+            }
+        }
+    }
+
+    @staticmethod
+    def detect() -> str:
+        if sys.platform.startswith('linux'):
+            ptypes = ShadowSocks.config.keys()
+            ps = os.popen('ps -Af').read()
+            for ptype in ptypes:
+                procs = ShadowSocks.config[ptype]['procs']
+                for p in procs:
+                    if ps.count(p):
+                        return ptype
+        return None
+
+    @staticmethod
+    def proxies() -> dict:
+        proxy_type = ShadowSocks.detect()
+        return ShadowSocks.config[proxy_type]['proxies'] if proxy_type is not None else {}
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from tvlinker.core.downloads import hoster_speeds
+from tvlinker.core.metrics import metrics
+import tvlinker.hostnames as hostnames
+
+API_URL = 'https://api.real-debrid.com/rest/1.0'
+
+
+class RealDebridClient:
+    def __init__(self, api_url: str, api_token: str, proxies: dict = None):
+        self.api_url = api_url
+        self.api_token = api_token
+        self.proxies = proxies or {}
+
+    def request(self, method: str, endpoint: str, payload: object = None) -> dict:
+        import requests
+        with metrics.timer('realdebrid%s' % endpoint, method=method) as fields:
+            res = requests.request(method, '{0}{1}?auth_token={2}'.format(self.api_url, endpoint, self.api_token),
+                                   data=payload, proxies=self.proxies)
+            fields['status'] = res.status_code
+        return res.json()
+
+    def post(self, endpoint: str, payload: object = None) -> dict:
+        return self.request('POST', endpoint, payload)
+
+    def get(self, endpoint: str) -> dict:
+        return self.request('GET', endpoint)
+
+    def unrestrict(self, link: str) -> dict:
+        return self.post(endpoint='/unrestrict/link', payload={'link': link}) or {}
+
+    def supported_hosts(self) -> dict:
+        return self.post(endpoint='/hosts')
+
+    def check_link(self, link: str) -> dict:
+        from requests import RequestException
+        try:
+            jsonres = self.post(endpoint='/unrestrict/check', payload={'link': link})
+        except (RequestException, ValueError):
+            jsonres = None
+        if jsonres is None:
+            available, jsonres = None, {}
+        else:
+            available = 'error' not in jsonres.keys() and jsonres.get('supported', 1) == 1
+        return {
+            'link': link,
+            'available': available,
+            'host': jsonres.get('host', ''),
+            'filename': jsonres.get('filename', ''),
+            'filesize': jsonres.get('filesize', 0)
+        }
+
+    def check_links(self, links: list) -> list:
+        """Check every link concurrently and return the results best mirror first."""
+        from concurrent.futures import ThreadPoolExecutor
+        from requests import RequestException
+        if not len(links):
+            return []
+        with ThreadPoolExecutor(max_workers=min(len(links), 8) + 1) as pool:
+            status = pool.submit(self.get, '/hosts/status')
+            results = list(pool.map(self.check_link, links))
+            try:
+                hosts = status.result() or {}
+            except (RequestException, ValueError):
+                hosts = {}
+        for result in results:
+            result['host_status'] = hosts.get(result['host'], {}).get('status', 'unknown')
+        results.sort(key=RealDebridClient.rank)
+        return results
+
+    @staticmethod
+    def rank(result: dict) -> tuple:
+        availability = {True: 0, None: 1, False: 2}[result['available']]
+        speed = hoster_speeds.get(hostnames.resolve(result['link']), 0)
+        return availability, result['host_status'] != 'up', -speed
+
+    @staticmethod
+    def is_unrestricted(link: str) -> bool:
+        return 'real-debrid.com' in link or 'rdeb.io' in link
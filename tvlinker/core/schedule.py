@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+
+
+class PollScheduler:
+    """Spreads polls over the day according to the posting rate seen in release timestamps.
+
+    The configured interval is the freshness target at the average posting rate: hours that see more posts
+    than average are polled more often, quiet hours less, within a quarter to four times the interval. Polls
+    that fail or find nothing new back off further until one finds new posts again.
+
+    >>> scheduler = PollScheduler(900)
+    >>> scheduler.next_interval(0)
+    900
+    >>> day = 86400
+    >>> scheduler.observe([d * day + 20 * 3600 + m * 60 for d in range(3) for m in range(0, 60, 5)])
+    >>> scheduler.observe([d * day + 4 * 3600 for d in range(3)])
+    >>> peak = scheduler.next_interval(20 * 3600)
+    >>> peak < 900 < scheduler.next_interval(4 * 3600)
+    True
+    >>> scheduler.next_interval(12 * 3600)
+    3600
+    >>> scheduler.record([])
+    >>> scheduler.record_error()
+    >>> scheduler.next_interval(20 * 3600) > peak
+    True
+
+    """
+    hours = 24
+
+    def __init__(self, interval: int, min_interval: int = None, max_interval: int = None, backoff: float = 2.0):
+        self.interval = interval
+        self.min_interval = min_interval or max(60, interval // 4)
+        self.max_interval = max_interval or interval * 4
+        self.backoff = backoff
+        self.posts = [0] * self.hours
+        self.days = set()
+        self.quiet = 0
+        self.errors = 0
+
+    def observe(self, timestamps: list) -> None:
+        """Count posting times, each post once, into per hour of day bins."""
+        for posted in timestamps:
+            if posted:
+                self.posts[time.gmtime(posted).tm_hour] += 1
+                self.days.add(posted // 86400)
+
+    def record(self, timestamps: list) -> None:
+        """A poll succeeded, finding posts with the given timestamps."""
+        self.observe(timestamps)
+        self.errors = 0
+        self.quiet = 0 if len(timestamps) else self.quiet + 1
+
+    def record_error(self) -> None:
+        self.errors += 1
+
+    def rate(self, at: float) -> float:
+        """Posts per hour expected around the hour of day at, smoothed over the neighbouring hours."""
+        if not len(self.days):
+            return 0.0
+        hour = time.gmtime(at).tm_hour
+        posts = sum(self.posts[(hour + offset) % self.hours] * weight
+                    for offset, weight in ((-1, .25), (0, .5), (1, .25)))
+        return posts / len(self.days)
+
+    def next_interval(self, now: float = None) -> int:
+        """Seconds to wait before the next poll."""
+        if not len(self.days):
+            delay = self.interval
+        else:
+            mean_rate = sum(self.posts) / (self.hours * len(self.days))
+            rate = self.rate(time.time() if now is None else now)
+            delay = self.interval * mean_rate / rate if rate else self.max_interval
+        delay *= self.backoff ** (self.errors + min(self.quiet, 3) / 2)
+        return int(min(self.max_interval * (2 if self.errors else 1), max(self.min_interval, delay)))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+
+from tvlinker.core.cancel import CancelToken
+from tvlinker.core.metrics import metrics
+from tvlinker.core.proxies import ShadowSocks
+from tvlinker.filesize import parse_size
+from tvlinker.timestamps import SOURCE_TIMEZONE, parse_timestamp
+import tvlinker.hostnames as hostnames
+
+SOURCE_URL = 'http://scene-rls.net/releases/index.php?p={0}&cat=TV%20Shows'
+RELEASE_URL = 'http://scene-rls.net/releases/{0}'
+
+
+class Scraper:
+    # connect and read timeouts, so a stalled request is given up on even when nobody cancels it
+    timeout = (10, 30)
+
+    def __init__(self, source_url: str = None, useragent: str = None, source_tz: str = SOURCE_TIMEZONE):
+        self.source_url = source_url
+        self.user_agent = useragent
+        self.source_tz = source_tz
+        self.session = None
+        self.seen_urls = set()
+        # posts on the last listing page read, seen ones included; none means the end of the listing
+        self.listed = 0
+        # the hoster prefetch threads share one scraper and its session
+        self.lock = threading.Lock()
+
+    def init_session(self) -> None:
+        # heavy imports are deferred until the first request
+        with metrics.timer('scrape.session'):
+            import cloudscraper
+            self.session = cloudscraper.create_scraper()
+            self.session.proxies = ShadowSocks.proxies()
+
+    def get(self, url: str) -> str:
+        if self.session is None:
+            with self.lock:
+                if self.session is None:
+                    self.init_session()
+        session = self.session
+        if session is None:
+            raise ConnectionError('session closed')
+        # Cloudflare challenges are solved inside the session's get, so they count towards the fetch
+        with metrics.timer('scrape.fetch', url=url) as fields:
+            res = session.get(url, timeout=self.timeout)
+            fields.update(status=res.status_code, redirects=len(res.history))
+        metrics.count('scrape.bytes', len(res.content))
+        # a 503 or Cloudflare error page would otherwise parse as an empty listing or a post without links
+        res.raise_for_status()
+        return res.text
+
+    def close(self) -> None:
+        """Drop the session and its pooled connections; safe to call from another thread to abort a scrape."""
+        session, self.session = self.session, None
+        if session is not None:
+            session.close()
+
+    def reset(self) -> None:
+        self.seen_urls.clear()
+
+    @staticmethod
+    def parse_listing(html: str, source_tz: str = SOURCE_TIMEZONE) -> list:
+        """Extract [posted, url, title, size] rows from a listing page."""
+        from bs4 import BeautifulSoup
+        rows = []
+        bs = BeautifulSoup(html, 'lxml')
+        for post in bs('div', class_='post'):
+            posted = parse_timestamp(post.find('div', class_='p-c p-c-time').get_text(), source_tz)
+            dlsize = post.find('h2').get_text().strip()
+            rows.append([
+                posted,
+                post.find('a', class_='p-title').get('href').strip(),
+                post.find('a', class_='p-title').get_text().strip(),
+                parse_size(dlsize[dlsize.rfind('(') + 1:len(dlsize) - 1])
+            ])
+        return rows
+
+    def scrape_page(self, pagenum: int, token: CancelToken = None) -> list:
+        """Rows of listing page pagenum, counting from zero, minus posts already seen since the last reset.
+
+        Posts shift down a page when new ones arrive mid-scrape, so the same post can turn up twice.
+        A cancelled token raises Cancelled once the request returns and between posts.
+        """
+        rows = []
+        html = self.get(self.source_url.format(pagenum + 1))
+        if token is not None:
+            token.check()
+        with metrics.timer('scrape.parse', page=pagenum):
+            listing = self.parse_listing(html, self.source_tz)
+        self.listed = len(listing)
+        for row in listing:
+            if token is not None:
+                token.check()
+            if row[1] not in self.seen_urls:
+                self.seen_urls.add(row[1])
+                rows.append(row)
+        return rows
+
+    @staticmethod
+    def parse_hosters(html: str) -> list:
+        """Extract [(title, [(hoster, url), ...]), ...] from a post page in one pass over its markup."""
+        from bs4 import BeautifulSoup, SoupStrainer
+        bs = BeautifulSoup(html, 'lxml', parse_only=SoupStrainer('div', class_='post'))
+        releases, title = [], ''
+        for tag in bs.find_all(['p', 'h2']):
+            if tag.name == 'p':
+                title = tag.get_text().strip()
+            elif tag.get('style') == 'text-align: center;':
+                links = [(hostnames.resolve(a['href']), a['href'])
+                         for a in tag.find_all('a', href=True)]
+                if len(links):
+                    releases.append((title, links))
+        return releases
+
+    def get_hosters(self, url: str) -> list:
+        html = self.get(url)
+        with metrics.timer('hosters.parse'):
+            return self.parse_hosters(html)
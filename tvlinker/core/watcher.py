@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+
+from tvlinker.cache import ReleaseCache
+from tvlinker.core.cancel import CancelToken
+from tvlinker.core.managers import hand_off
+from tvlinker.core.realdebrid import RealDebridClient
+from tvlinker.core.scraper import RELEASE_URL, Scraper
+from tvlinker.releasename import episode_key, normalize, parse_release
+
+try:
+    # noinspection PyPackageRequirements
+    import simplejson as json
+except ImportError:
+    import json
+
+
+class FavoritesMatcher:
+    """Favorites compiled into a single pattern searched for in normalised show names.
+
+    >>> matcher = FavoritesMatcher(['The Simpsons', 'south.park', ''])
+    >>> matcher.match('South.Park.S23E05.720p.HDTV.x264-AVS')
+    'south park'
+    >>> matcher.match('Family.Guy.S18E01.720p.HDTV.x264-AVS') is None
+    True
+    >>> matcher.match('Show.S01E01.1080p.WEB.x264-GRP', resolution='720p') is None
+    True
+
+    """
+    def __init__(self, favorites: list):
+        faves = sorted({normalize(fave) for fave in favorites or [] if len(fave.strip())}, key=len, reverse=True)
+        self.pattern = re.compile('|'.join(re.escape(fave) for fave in faves)) if len(faves) else None
+
+    def match(self, title: str, resolution: str = None) -> str:
+        """The favorite title's show matches, or None; resolution optionally pins the quality."""
+        if self.pattern is None:
+            return None
+        name = parse_release(title)
+        if resolution and name.resolution != resolution.lower():
+            return None
+        m = self.pattern.search(normalize(name.show))
+        return m.group(0) if m is not None else None
+
+
+class WatchHistory:
+    """Episodes already queued by the watcher, persisted so repeats are suppressed across runs."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.episodes = {}
+        if os.path.isfile(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as historyfile:
+                    self.episodes = json.load(historyfile)
+            except (OSError, ValueError):
+                self.episodes = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.episodes
+
+    def add(self, key: str, url: str) -> None:
+        self.episodes[key] = url
+        self.save()
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmpfile = '%s.tmp' % self.path
+        with open(tmpfile, 'w', encoding='utf-8') as historyfile:
+            json.dump(self.episodes, historyfile)
+        os.replace(tmpfile, self.path)
+
+
+class FavoritesWatcher:
+    """Polls the first listing page, matches new posts against favorites and queues them for download.
+
+    Built-in downloads run in the polling thread unless a downloader is given, which is then called with
+    each link instead, e.g. to start it from the GUI thread.
+    """
+
+    def __init__(self, scraper: Scraper, cache: ReleaseCache, history: WatchHistory, favorites: list, settings,
+                 realdebrid: RealDebridClient = None, downloader=None, release_url: str = RELEASE_URL):
+        self.scraper = scraper
+        self.release_url = release_url
+        self.cache = cache
+        self.history = history
+        self.matcher = FavoritesMatcher(favorites)
+        self.settings = settings
+        self.realdebrid = realdebrid
+        self.downloader = downloader
+        self.manager = settings.value('download_manager', 'built-in')
+        self.resolution = settings.value('watch_resolution')
+        self.token = CancelToken()
+        self.token.on_cancel(self.scraper.close)
+
+    def cancel(self) -> None:
+        """Stop a poll from another thread, aborting the request in flight."""
+        self.token.cancel()
+
+    def poll(self) -> tuple:
+        """Scrape page one and queue matching episodes not queued before.
+
+        Returns the rows not in the release cache yet and a list of (title, link) pairs that were handed to the
+        download manager. Whether an episode is queued only depends on the watch history, as the cache also
+        holds what the window and tvlinker-cli scraped. A listing page that cannot be read raises, so callers
+        record a failed poll rather than a quiet one.
+        """
+        self.scraper.reset()
+        listing = self.scraper.scrape_page(0, self.token)
+        rows = self.cache.merge(listing)
+        queued = []
+        for row in listing:
+            self.token.check()
+            key = episode_key(row[2])
+            if key in self.history or self.matcher.match(row[2], self.resolution) is None:
+                continue
+            link = self.queue(row)
+            if link is not None:
+                self.history.add(key, row[1])
+                queued.append((row[2], link))
+        return rows, queued
+
+    @staticmethod
+    def pick_release(releases: list, title: str, resolution: str = None) -> list:
+        """Mirrors of the release block on a post page for title, or else for the resolution wanted.
+
+        Posts often carry a 720p and a 1080p block, the one queued must be the quality that matched.
+
+        >>> releases = [('Show.S01E01.720p.WEB.x264-GRP', ['720p mirror']),
+        ...             ('Show.S01E01.1080p.WEB.x264-GRP', ['1080p mirror'])]
+        >>> FavoritesWatcher.pick_release(releases, 'Show.S01E01.1080p.WEB.x264-GRP')
+        ['1080p mirror']
+        >>> FavoritesWatcher.pick_release(releases, 'Show.S01E01.1080p.WEB.H264-OTHER')
+        ['1080p mirror']
+        >>> FavoritesWatcher.pick_release(releases, 'Show.S01E01.WEB.x264-GRP', '2160p')
+        []
+
+        """
+        for name, mirrors in releases:
+            if name.strip().lower() == title.strip().lower():
+                return mirrors
+        resolution = (resolution or parse_release(title).resolution or '').lower()
+        for name, mirrors in releases:
+            if not resolution or parse_release(name).resolution == resolution:
+                return mirrors
+        return []
+
+    def mirrors(self, row: list) -> list:
+        releases = self.scraper.get_hosters(self.release_url.format(row[1]))
+        links = [link for hoster, link in self.pick_release(releases, row[2], self.resolution)]
+        if self.realdebrid is not None and len(links):
+            links = [result['link'] for result in self.realdebrid.check_links(links)
+                     if result['available'] is not False]
+        return links
+
+    def queue(self, row: list) -> str:
+        from requests import RequestException
+        try:
+            mirrors = self.mirrors(row)
+        except (RequestException, ValueError):
+            # only the post page or link check failed, the episode is tried again on the next poll
+            return None
+        for mirror in mirrors:
+            link = mirror
+            if self.realdebrid is not None and not RealDebridClient.is_unrestricted(mirror):
+                try:
+                    link = self.realdebrid.unrestrict(mirror).get('download')
+                except (RequestException, ValueError):
+                    continue
+            if link is not None and self.hand_off(link):
+                return link
+        return None
+
+    def hand_off(self, link: str) -> bool:
+        if self.downloader is not None and (self.manager or 'built-in').lower() == 'built-in':
+            self.downloader(link)
+            return True
+        return hand_off(link, self.manager, self.settings)
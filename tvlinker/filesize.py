@@ -1,4 +1,6 @@
 
+import re
+
 traditional = [
     (1024 ** 5, 'P'),
     (1024 ** 4, 'T'), 
@@ -108,3 +110,74 @@ def size(bytes, system=traditional):
             suffix = multiple
     return str(amount) + suffix
 
+
+def _unit_table(*systems):
+    units = {}
+    for system in systems:
+        for factor, suffix in system:
+            for name in (suffix if isinstance(suffix, tuple) else (suffix,)):
+                name = name.strip().lower()
+                units.setdefault(name, factor)
+                if name.endswith('i'):
+                    units.setdefault(name + 'b', factor)
+    return units
+
+
+_units = _unit_table(alternative, traditional, iec)
+_size_pattern = re.compile(r'(\d+(?:,\d+)*(?:\.\d+)?)\s*([a-zA-Z]*)')
+
+
+def parse_size(text, units=_units):
+    """Bytes from a human-readable size, using the factors of the tables above.
+
+    Scene releases quote sizes in the traditional 1024 based units::
+
+    >>> parse_size('1.5 GB')
+    1610612736
+    >>> parse_size('700MB')
+    734003200
+    >>> parse_size('1,4 GiB')
+    1503238553
+    >>> parse_size('2,345.6 MB')
+    2459539865
+    >>> parse_size('1,024 MB')
+    1073741824
+    >>> parse_size('512 bytes')
+    512
+    >>> parse_size('N/A')
+    0
+
+    """
+    m = _size_pattern.search(text)
+    if m is None:
+        return 0
+    number = m.group(1)
+    # a comma is the decimal point unless a point follows it, it repeats or three digits follow it,
+    # then it separates thousands
+    if '.' in number or number.count(',') > 1 or len(number.partition(',')[2]) == 3:
+        number = number.replace(',', '')
+    else:
+        number = number.replace(',', '.')
+    amount = float(number)
+    return int(amount * units.get(m.group(2).lower(), 1))
+
+
+def format_size(bytes, system=alternative, places=2):
+    """Human-readable file size keeping up to places decimals.
+
+    >>> format_size(1610612736)
+    '1.5 GB'
+    >>> format_size(734003200)
+    '700 MB'
+    >>> format_size(0)
+    '0 bytes'
+
+    """
+    for factor, suffix in system:
+        if bytes >= factor:
+            break
+    amount = ('%.*f' % (places, bytes / factor)).rstrip('0').rstrip('.')
+    if isinstance(suffix, tuple):
+        singular, multiple = suffix
+        suffix = singular if amount == '1' else multiple
+    return amount + suffix
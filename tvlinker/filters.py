@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+import time
+
+from tvlinker.filesize import parse_size
+from tvlinker.releasename import ReleaseName, normalize, parse_release
+
+DATE_COLUMN, SIZE_COLUMN = 0, 3
+
+_durations = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+_range_pattern = re.compile(r'^(size|age):([<>]?)([^<>\s-]*)(?:-([^\s-]+))?$', re.IGNORECASE)
+_duration_pattern = re.compile(r'^(\d+(?:\.\d+)?)\s*([smhdw]?)$', re.IGNORECASE)
+_field_pattern = re.compile(r'^(show|season|episode|res|source|group):(\S+)$', re.IGNORECASE)
+_field_names = {'res': 'resolution'}
+
+
+def parse_duration(text: str) -> int:
+    """Seconds from a short duration such as 90m, 6h or 2d; bare numbers are hours.
+
+    >>> parse_duration('6h')
+    21600
+    >>> parse_duration('1.5d')
+    129600
+    >>> parse_duration('12')
+    43200
+
+    """
+    m = _duration_pattern.match(text.strip())
+    if m is None:
+        raise ValueError('invalid duration: %s' % text)
+    return int(float(m.group(1)) * _durations[(m.group(2) or 'h').lower()])
+
+
+def parse_query(text: str, now: float = None) -> tuple:
+    """Split search text into the remaining substring, numeric ranges keyed by model column and
+    release name fields.
+
+    size:LOW-HIGH, size:>LOW and size:<HIGH bound the release size; age:<6h keeps releases posted in
+    the last six hours and age:1d-2d those posted between one and two days ago. Bounds are inclusive and
+    None leaves a side open. show:, season:, episode:, res:, source: and group: match the parsed release
+    name. Anything else is kept as search text.
+
+    >>> parse_query('size:500mb-2gb big bang')
+    ('big bang', {3: (524288000, 2147483648)}, {})
+    >>> parse_query('age:<6h', now=100000)
+    ('', {0: (78400, None)}, {})
+    >>> parse_query('age:1d-2d size:>1gb', now=200000)
+    ('', {0: (27200, 113600), 3: (1073741824, None)}, {})
+    >>> parse_query('size:huge')
+    ('size:huge', {}, {})
+    >>> parse_query('show:big.bang season:12 res:720P')
+    ('', {}, {'show': 'big bang', 'season': 12, 'resolution': '720p'})
+
+    """
+    now = time.time() if now is None else now
+    terms, ranges, fields = [], {}, {}
+    for token in text.split():
+        m = _range_pattern.match(token)
+        try:
+            if m is None:
+                field = _field_pattern.match(token)
+                if field is None:
+                    raise ValueError
+                name = field.group(1).lower()
+                value = field.group(2)
+                fields[_field_names.get(name, name)] = int(value) if name in ('season', 'episode') \
+                    else normalize(value)
+                continue
+            field, op, low, high = m.group(1).lower(), m.group(2), m.group(3), m.group(4)
+            parse = parse_size if field == 'size' else parse_duration
+            if op == '<':
+                bounds = (None, parse(low))
+            elif op == '>':
+                bounds = (parse(low), None)
+            else:
+                bounds = (parse(low), parse(high) if high else None)
+            if field == 'size':
+                if not any(bounds):
+                    raise ValueError
+                ranges[SIZE_COLUMN] = bounds
+            else:
+                # a maximum age is a minimum post time, so the bounds swap over
+                ranges[DATE_COLUMN] = (None if bounds[1] is None else int(now - bounds[1]),
+                                       None if bounds[0] is None else int(now - bounds[0]))
+        except ValueError:
+            terms.append(token)
+    return ' '.join(terms), ranges, fields
+
+
+def match_fields(name: ReleaseName, fields: dict, show_key: str = None) -> bool:
+    """Whether a parsed release name satisfies every field of a query.
+
+    >>> match_fields(parse_release('Show.Name.S01E02.720p.HDTV.x264-GRP'), {'show': 'show', 'resolution': '720p'})
+    True
+    >>> match_fields(parse_release('Show.Name.S01E02.720p.HDTV.x264-GRP'), {'season': 2})
+    False
+
+    """
+    for field, value in fields.items():
+        if field == 'show':
+            if value not in (show_key if show_key is not None else normalize(name.show)):
+                return False
+        elif field in ('season', 'episode'):
+            if getattr(name, field) != value:
+                return False
+        elif (getattr(name, field) or '').lower() != value:
+            return False
+    return True
+
+
+def in_ranges(release: list, ranges: dict) -> bool:
+    return all((low is None or release[column] >= low) and (high is None or release[column] <= high)
+               for column, (low, high) in ranges.items())
+
+
+def filter_releases(releases: list, query: str, now: float = None) -> list:
+    """Releases matching a search query by the same rules as the table filter, for use without Qt.
+
+    >>> releases = [[1000, 'a.html', 'Show.S01E01.720p.WEB.x264-GRP', 734003200],
+    ...             [2000, 'b.html', 'Other.S02E03.1080p.WEB.x264-GRP', 2147483648]]
+    >>> [release[1] for release in filter_releases(releases, 'size:<1gb')]
+    ['a.html']
+    >>> [release[1] for release in filter_releases(releases, 'res:1080p other')]
+    ['b.html']
+
+    """
+    text, ranges, fields = parse_query(query, now)
+    text = text.lower()
+    matched = []
+    for release in releases:
+        if len(ranges) and not in_ranges(release, ranges):
+            continue
+        if len(fields) and not match_fields(parse_release(release[2]), fields):
+            continue
+        if len(text) and text not in ('%s\n%s' % (release[1], release[2])).lower():
+            continue
+        matched.append(release)
+    return matched
@@ -3,144 +3,262 @@
 
 import sys
 
-from bs4 import BeautifulSoup, SoupStrainer, Tag
+from PyQt5.QtCore import QAbstractListModel, QEvent, QModelIndex, QPoint, QRect, QSize, QUrl, Qt, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import (QCloseEvent, QColor, QDesktopServices, QFont, QFontMetrics, QLinearGradient, QPainter,
+                         QPalette, QPen, QPixmap, QPixmapCache)
+from PyQt5.QtWidgets import (QAbstractItemView, QDialog, QListView, QMenu, QProgressBar, QProgressDialog,
+                             QSizePolicy, QStyledItemDelegate, QStyleFactory, QStyleOptionViewItem,
+                             QToolTip, QVBoxLayout, QWidget, qApp)
 
-from PyQt5.QtCore import QSize, QUrl, Qt, pyqtSignal, pyqtSlot
-from PyQt5.QtGui import QCloseEvent, QColor, QDesktopServices, QIcon, QPalette
-from PyQt5.QtWidgets import (QDialog, QGraphicsDropShadowEffect, QHBoxLayout, QLabel, QMenu, QProgressBar,
-                             QProgressDialog, QPushButton, QScrollArea, QSizePolicy, QStyleFactory,
-                             QVBoxLayout, QWidget, qApp)
+import tvlinker.hostnames as hostnames
+
+
+class HosterIcons:
+    path = ':assets/images/hosters/%s.png'
+
+    @staticmethod
+    def pixmap(hoster: str) -> QPixmap:
+        key = 'hoster:%s' % hoster
+        pixmap = QPixmapCache.find(key)
+        if pixmap is None or pixmap.isNull():
+            pixmap = QPixmap(HosterIcons.path % hoster)
+            if not pixmap.isNull():
+                pixmap = pixmap.scaled(HosterLinksDelegate.icon_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            QPixmapCache.insert(key, pixmap)
+        return pixmap
+
+
+class HosterLinksModel(QAbstractListModel):
+    LinksRole = Qt.UserRole + 1
+
+    def __init__(self, parent=None):
+        super(HosterLinksModel, self).__init__(parent)
+        self.releases = []
+        self.status = {}
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.releases)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        title, links = self.releases[index.row()]
+        if role == Qt.DisplayRole:
+            return title
+        elif role == HosterLinksModel.LinksRole:
+            return links
+        return None
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlags:
+        return Qt.ItemIsEnabled
+
+    def set_releases(self, releases: list) -> None:
+        self.beginResetModel()
+        self.releases = releases
+        self.endResetModel()
+
+    def set_status(self, results: list) -> None:
+        """Apply ranked link check results, reordering each release's mirrors to match."""
+        self.status = {result['link']: result for result in results}
+        ranking = {result['link']: rank for rank, result in enumerate(results)}
+        self.beginResetModel()
+        self.releases = [(title, sorted(links, key=lambda link: ranking.get(link[1], len(ranking))))
+                         for title, links in self.releases]
+        self.endResetModel()
+
+
+class HosterLinksDelegate(QStyledItemDelegate):
+    linkClicked = pyqtSignal(str, QPoint)
+
+    icon_size = QSize(100, 21)
+    button_size = QSize(112, 35)
+    title_height = 38
+    spacing = 6
+    margin = 15
+
+    def __init__(self, parent=None):
+        super(HosterLinksDelegate, self).__init__(parent)
+        self.title_font = QFont('Open Sans', 11)
+        self.hover_pos = QPoint(-1, -1)
+
+    def title_rect(self, rect: QRect) -> QRect:
+        return QRect(rect.left(), rect.top(), rect.width(), self.title_height)
+
+    def button_rects(self, rect: QRect, count: int) -> list:
+        per_line = max(1, (rect.width() + self.spacing) // (self.button_size.width() + self.spacing))
+        rects = []
+        for pos in range(count):
+            line, col = divmod(pos, per_line)
+            in_line = min(per_line, count - line * per_line)
+            line_width = in_line * self.button_size.width() + (in_line - 1) * self.spacing
+            left = rect.left() + (rect.width() - line_width) // 2
+            rects.append(QRect(left + col * (self.button_size.width() + self.spacing),
+                               rect.top() + self.title_height + self.spacing
+                               + line * (self.button_size.height() + self.spacing),
+                               self.button_size.width(), self.button_size.height()))
+        return rects
+
+    def link_at(self, pos: QPoint, rect: QRect, links: list) -> tuple:
+        for button, link in zip(self.button_rects(rect, len(links)), links):
+            if button.contains(pos):
+                return link
+        return None
+
+    def sizeHint(self, option: QStyleOptionViewItem, index: QModelIndex) -> QSize:
+        links = index.data(HosterLinksModel.LinksRole)
+        title_width = QFontMetrics(self.title_font).width(index.data()) + 40
+        buttons_width = len(links) * (self.button_size.width() + self.spacing) - self.spacing
+        # wrap the buttons to the width the option was set up for, else to the view's
+        available = option.rect.width()
+        if available <= 0:
+            available = option.widget.viewport().width() if option.widget is not None else 0
+        width = max(title_width, min(buttons_width, available) if available else buttons_width)
+        rects = self.button_rects(QRect(0, 0, available or width, 0), len(links))
+        bottom = rects[-1].bottom() + 1 if len(rects) else self.title_height
+        return QSize(width, bottom + self.margin)
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex) -> None:
+        painter.save()
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        title = self.title_rect(option.rect)
+        painter.setPen(QColor('#C0C0C0'))
+        painter.setBrush(QColor('#FEFEFE'))
+        painter.drawRect(title.adjusted(0, 0, -1, -1))
+        painter.setPen(QColor('#444'))
+        painter.setFont(self.title_font)
+        painter.drawText(title, Qt.AlignCenter, index.data())
+        links = index.data(HosterLinksModel.LinksRole)
+        status = index.model().status
+        for button, (hoster, link) in zip(self.button_rects(option.rect, len(links)), links):
+            painter.setOpacity(0.35 if status.get(link, {}).get('available') is False else 1.0)
+            hovered = button.contains(self.hover_pos)
+            gradient = QLinearGradient(button.topLeft(), button.bottomLeft())
+            gradient.setColorAt(0, QColor('#B9B9B9' if hovered else '#FEFEFE'))
+            gradient.setColorAt(1, QColor('#DADBDE' if hovered else '#FAFAFA'))
+            painter.setPen(QPen(QColor('#B9B9B9')))
+            painter.setBrush(gradient)
+            painter.drawRect(button.adjusted(0, 0, -1, -1))
+            pixmap = HosterIcons.pixmap(hoster)
+            if pixmap.isNull():
+                painter.setPen(QColor('#444'))
+                painter.drawText(button, Qt.AlignCenter, hoster)
+            else:
+                painter.drawPixmap(button.center().x() - pixmap.width() // 2,
+                                   button.center().y() - pixmap.height() // 2, pixmap)
+        painter.restore()
+
+    def editorEvent(self, event: QEvent, model: QAbstractListModel, option: QStyleOptionViewItem,
+                    index: QModelIndex) -> bool:
+        if event.type() == QEvent.MouseMove:
+            self.hover_pos = event.pos()
+            option.widget.viewport().update()
+            link = self.link_at(event.pos(), option.rect, index.data(HosterLinksModel.LinksRole))
+            option.widget.viewport().setCursor(Qt.PointingHandCursor if link is not None else Qt.ArrowCursor)
+        elif event.type() == QEvent.MouseButtonRelease and event.button() in (Qt.LeftButton, Qt.RightButton):
+            link = self.link_at(event.pos(), option.rect, index.data(HosterLinksModel.LinksRole))
+            if link is not None:
+                self.linkClicked.emit(link[1], event.globalPos())
+                return True
+        return super(HosterLinksDelegate, self).editorEvent(event, model, option, index)
+
+    def helpEvent(self, event: QEvent, view: QAbstractItemView, option: QStyleOptionViewItem,
+                  index: QModelIndex) -> bool:
+        link = self.link_at(event.pos(), option.rect, index.data(HosterLinksModel.LinksRole))
+        if link is not None:
+            status = index.model().status.get(link[1])
+            if status is None:
+                tooltip = link[0]
+            elif status['available'] is False:
+                tooltip = '%s - file unavailable' % link[0]
+            else:
+                tooltip = '%s - host %s' % (link[0], status['host_status'])
+            QToolTip.showText(event.globalPos(), tooltip, view)
+            return True
+        return super(HosterLinksDelegate, self).helpEvent(event, view, option, index)
 
 
 class HosterLinks(QDialog):
     downloadLink = pyqtSignal(str)
+    downloadRelease = pyqtSignal(list)
     copyLink = pyqtSignal(str)
 
+    stylesheet = '''
+        QDialog#hosters QListView { background-color: transparent; border: none; }
+        QMenu {
+            border-radius: 0;
+            border: 1px solid #C0C2C3;
+            background-color: #FAFAFA;
+            color: #4C4C4C;
+        }
+        QMenu::item { text-align: center; }
+        QMenu::item:selected, QMenu::item:hover { background-color: #6A687D; color: #FFF; }'''
+
     def __init__(self, parent, f=Qt.WindowCloseButtonHint):
         super(HosterLinks, self).__init__(parent, f)
         self.parent = parent
         self.setObjectName('hosters')
+        self.setStyleSheet(HosterLinks.stylesheet)
         self.loading_progress = HosterProgress('Retrieving hoster links...', 0, 0, self.parent,
                                                Qt.WindowCloseButtonHint)
+        self.menu_link = None
+        self.menu = QMenu(self)
+        self.menu.setCursor(Qt.PointingHandCursor)
+        self.menu.setFixedWidth(128)
+        self.menu.addAction('  COPY LINK', lambda: self.copy_link(self.menu_link), 0)
+        self.menu.addAction('  OPEN LINK', lambda: self.open_link(self.menu_link), 0)
+        self.menu.addAction(' DOWNLOAD', lambda: self.download_link(self.menu_link), 0)
+        self.menu.addAction(' ALL MIRRORS', lambda: self.download_release(self.menu_link), 0)
+        self.model = HosterLinksModel(self)
+        self.delegate = HosterLinksDelegate(self)
+        self.delegate.linkClicked.connect(self.show_menu)
+        self.view = QListView(self)
+        self.view.setMouseTracking(True)
+        self.view.setUniformItemSizes(False)
+        self.view.setResizeMode(QListView.Adjust)
+        self.view.setSpacing(0)
+        self.view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.view.setItemDelegate(self.delegate)
+        self.view.setModel(self.model)
         self.layout = QVBoxLayout()
         self.layout.setSpacing(15)
+        self.layout.addWidget(self.view)
         self.setLayout(self.layout)
         self.setWindowTitle('Hoster Links')
         self.setWindowModality(Qt.ApplicationModal)
         self.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
 
-    def show_hosters(self, links: list) -> None:
-        self.links = links
+    def show_hosters(self, releases: list) -> None:
         self.loading_progress.cancel()
-        hosterswidget_layout = QVBoxLayout()
-        for tag in self.links:
-            title_label = QLabel(HosterLinks.bs_tag_to_string(tag.find_previous('p')), self)
-            title_label.setTextInteractionFlags(Qt.TextBrowserInteraction)
-            title_label.setCursor(Qt.IBeamCursor)
-            title_label.setOpenExternalLinks(True)
-            title_label.setAlignment(Qt.AlignCenter)
-            title_label.setStyleSheet('QLabel { margin: 0; color: #444; font-size: 14px; padding: 8px; ' +
-                                      'border: 1px solid #C0C0C0; background-color: #FEFEFE; }')
-            title_layout = QHBoxLayout()
-            title_layout.setContentsMargins(0, 0, 0, 0)
-            title_layout.setSpacing(6)
-            title_layout.addStretch(1)
-            bs = BeautifulSoup(HosterLinks.bs_tag_to_string(tag), 'lxml', parse_only=SoupStrainer('a'))
-            for anchor in bs:
-                link = anchor['href']
-                hoster_name = HosterLinks.get_hoster_name(link)
-                menu = QMenu(self)
-                menu.setCursor(Qt.PointingHandCursor)
-                menu.addAction('  COPY LINK', lambda dl=link: self.copy_link(dl), 0)
-                menu.addAction('  OPEN LINK', lambda dl=link: self.open_link(dl), 0)
-                menu.addAction(' DOWNLOAD', lambda dl=link: self.download_link(dl), 0)
-                shadow = QGraphicsDropShadowEffect()
-                shadow.setColor(Qt.gray)
-                shadow.setBlurRadius(10)
-                shadow.setOffset(2, 2)
-                hoster_btn = QPushButton(self)
-                hoster_btn.setStyle(QStyleFactory.create('Fusion'))
-                hoster_btn.setGraphicsEffect(shadow)
-                hoster_btn.setDefault(False)
-                hoster_btn.setAutoDefault(False)
-                hoster_btn.setToolTip(hoster_name)
-                hoster_btn.setCursor(Qt.PointingHandCursor)
-                hoster_btn.setIcon(QIcon(self.parent.get_path('images/hosters/%s.png' % hoster_name)))
-                hoster_btn.setIconSize(QSize(100, 21))
-                hoster_btn.setStyleSheet('''
-                    QPushButton {
-                        background-color: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                                                          stop: 0 #FEFEFE, stop: 1 #FAFAFA);
-                        padding: 6px 0;
-                        border-radius: 0;
-                        border: 1px solid #B9B9B9;
-                    }
-                    QPushButton:hover {
-                        background-color: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                                                          stop: 0 #B9B9B9, stop: 1 #DADBDE);
-                    }
-                    QPushButton:pressed {
-                        border: 1px inset #B9B9B9;
-                        background-color: qlineargradient(x1: 0, y1: 0, x2: 0, y2: 1,
-                                                          stop: 0 #DADBDE, stop: 1 #B9B9B9);
-                    }
-                    QPushButton::menu-indicator { left: -2000px; }
-                ''')
-                menu.setFixedWidth(118)
-                menu.setStyleSheet('''
-                    QMenu {
-                        border-radius: 0;
-                        border: 1px solid #C0C2C3;
-                        background-color: #FAFAFA;
-                        color: #4C4C4C;
-                    }
-                    QMenu::item { text-align: center; }
-                    QMenu::item:selected, QMenu::item:hover { background-color: #6A687D; color: #FFF; }''')
-                hoster_btn.setMenu(menu)
-                title_layout.addWidget(hoster_btn)
-            title_layout.addStretch(1)
-            hoster_layout = QVBoxLayout()
-            hoster_layout.addWidget(title_label)
-            hoster_layout.addLayout(title_layout)
-            hosterswidget_layout.addLayout(hoster_layout)
-            hosterswidget_layout.addSpacing(15)
-
-        stretch_layout = QHBoxLayout()
-        stretch_layout.addStretch(1)
-        stretch_layout.addLayout(hosterswidget_layout)
-        stretch_layout.addStretch(1)
-        hosters_widget = QWidget(self)
-        hosters_widget.setLayout(stretch_layout)
-        scrollarea = QScrollArea(self)
-        scrollarea.setFrameShape(QScrollArea.NoFrame)
-        scrollarea.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        scrollarea.setWidget(hosters_widget)
-        scrollarea.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        scrollarea.setMinimumWidth(hosters_widget.geometry().width() + 20)
-        self.layout.addWidget(scrollarea)
-        w = scrollarea.width() + 15
-        h = hosters_widget.geometry().height() + 10
-        self.setFixedSize(w if w <= 810 else 810, h if h <= 750 else 750)
+        self.model.set_releases(releases)
+        # the buttons wrap to the viewport, so the width is settled first and the heights measured at it
+        frame = 2 * self.delegate.margin + self.view.verticalScrollBar().sizeHint().width()
+        option = self.view.viewOptions()
+        option.rect = QRect(0, 0, 810 - frame, 0)
+        width = max([self.delegate.sizeHint(option, self.model.index(row)).width()
+                     for row in range(self.model.rowCount())] or [485])
+        w = min(width + frame, 810)
+        option.rect = QRect(0, 0, w - frame, 0)
+        height = sum(self.delegate.sizeHint(option, self.model.index(row)).height()
+                     for row in range(self.model.rowCount()))
+        h = height + 2 * self.delegate.margin
+        self.setFixedSize(w, h if h <= 750 else 750)
         self.show()
         qApp.restoreOverrideCursor()
 
-    @staticmethod
-    def bs_tag_to_string(bstag: Tag) -> str:
-        return ''.join(str(item) for item in bstag.contents)
+    @pyqtSlot(list)
+    def rank_links(self, results: list) -> None:
+        self.model.set_status(results)
+
+    @pyqtSlot(str, QPoint)
+    def show_menu(self, link: str, pos: QPoint) -> None:
+        self.menu_link = link
+        self.menu.popup(pos)
 
     @staticmethod
     def get_hoster_name(link: str) -> str:
-        name = QUrl(link).host().replace('www.', '').replace('.com', '').replace('.net', '') \
-            .replace('.org', '').replace('.co', '').replace('.to', '').replace('.download', '')
-        if name == 'businessnewscurrent.online':
-            name = 'cloudyfiles'
-        elif name == 'drop':
-            name = 'dropapk'
-        elif name == 'nitro':
-            name = 'nitroflare'
-        elif name == 'ul':
-            name = 'uploaded'
-        return name
+        return hostnames.resolve(link)
 
     @pyqtSlot(str)
     def copy_link(self, link: str) -> None:
@@ -155,6 +273,16 @@ class HosterLinks(QDialog):
     def download_link(self, link: str) -> None:
         self.downloadLink.emit(link)
 
+    @pyqtSlot(str)
+    def download_release(self, link: str) -> None:
+        # the chosen mirror goes first, the rest follow in their ranked order
+        for title, links in self.model.releases:
+            mirrors = [url for hoster, url in links]
+            if link in mirrors:
+                mirrors.remove(link)
+                self.downloadRelease.emit([link] + mirrors)
+                return
+
     def closeEvent(self, event: QCloseEvent) -> None:
         self.loading_progress.cancel()
         self.deleteLater()
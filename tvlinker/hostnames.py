@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import sys
+from urllib.parse import urlsplit
+
+try:
+    # noinspection PyPackageRequirements
+    import simplejson as json
+except ImportError:
+    import json
+
+
+class HosterResolver:
+    """Map a link or hostname to the hoster name used for icons and labels.
+
+    The prefix/suffix tables and aliases come from hosters.json so new hosters and
+    mirror domains can be added without touching code. Results are memoized per host.
+
+    >>> resolver = HosterResolver.default()
+    >>> resolver.resolve('https://rapidgator.net/file/0d7b2d9c5b1e/Show.S01E01.720p.mkv.html')
+    'rapidgator'
+    >>> resolver.resolve('https://www.nitroflare.com/view/9A1C3F0E2B4D5A7/Show.S01E01.720p.mkv')
+    'nitroflare'
+    >>> resolver.resolve('https://nitro.download/view/9A1C3F0E2B4D5A7/Show.S01E01.720p.mkv')
+    'nitroflare'
+    >>> resolver.resolve('http://ul.to/8fk2k1a9')
+    'uploaded'
+    >>> resolver.resolve('https://uploadgig.com/file/download/4cF1b2e3D4/Show.S01E01.720p.mkv')
+    'uploadgig'
+    >>> resolver.resolve('https://drop.download/x1y2z3a4b5c6')
+    'dropapk'
+    >>> resolver.resolve('https://businessnewscurrent.online/4k3j2h1g0f9e')
+    'cloudyfiles'
+    >>> resolver.resolve('https://uploading.site/abc123/Show.S01E01.720p.mkv.html')
+    'uploading.site'
+    >>> resolver.resolve('https://www.filefactory.com/file/3c8x9y2z1a0b/Show.S01E01.720p.mkv')
+    'filefactory'
+    >>> resolver.resolve('https://go4up.com/dl/7d6e5f4a3b2c')
+    'go4up'
+    >>> resolver.resolve('https://multiup.org/download/0a9b8c7d6e5f/Show.S01E01.720p.mkv')
+    'multiup'
+    >>> resolver.resolve('https://www.4downfiles.co/n4w8kz0x2y1q')
+    '4downfiles'
+    >>> resolver.resolve('RapidGator.NET')
+    'rapidgator'
+    """
+
+    datafile = 'hosters.json'
+    _default = None
+
+    def __init__(self):
+        self.prefixes = []
+        self.suffixes = []
+        self.aliases = {}
+        self.pattern = None
+        self.memo = {}
+
+    @staticmethod
+    def default() -> 'HosterResolver':
+        if HosterResolver._default is None:
+            HosterResolver._default = HosterResolver()
+            HosterResolver._default.load(HosterResolver.get_path(HosterResolver.datafile))
+        return HosterResolver._default
+
+    @staticmethod
+    def get_path(path: str) -> str:
+        prefix = sys._MEIPASS if getattr(sys, 'frozen', False) else os.path.dirname(os.path.abspath(__file__))
+        return os.path.join(prefix, path)
+
+    def load(self, path: str) -> bool:
+        """Merge the tables from a hosters.json file, later files overriding earlier ones."""
+        if not os.path.isfile(path):
+            return False
+        with open(path, 'r', encoding='utf-8') as datafile:
+            data = json.load(datafile)
+        self.prefixes = sorted(set(self.prefixes) | set(data.get('prefixes', [])), key=len, reverse=True)
+        self.suffixes = sorted(set(self.suffixes) | set(data.get('suffixes', [])), key=len, reverse=True)
+        self.aliases.update({host.lower(): name for host, name in data.get('aliases', {}).items()})
+        self.pattern = re.compile(r'^(?:%s)?(?P<name>.+?)(?:%s)?$' % (
+            '|'.join(re.escape(prefix) for prefix in self.prefixes),
+            '|'.join(re.escape(suffix) for suffix in self.suffixes)))
+        self.memo.clear()
+        return True
+
+    def resolve(self, link: str) -> str:
+        host = urlsplit(link).hostname if '//' in link else link.lower()
+        if host is None:
+            return ''
+        name = self.memo.get(host)
+        if name is None:
+            name = self.aliases.get(host)
+            if name is None:
+                name = self.pattern.match(host).group('name') if self.pattern is not None else host
+                name = self.aliases.get(name, name)
+            self.memo[host] = name
+        return name
+
+
+def resolve(link: str) -> str:
+    return HosterResolver.default().resolve(link)
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+from bisect import bisect_left, bisect_right
+
+from PyQt5.QtCore import (QAbstractItemModel, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt, pyqtSignal,
+                          pyqtSlot)
+from PyQt5.QtGui import QFont
+
+from tvlinker.filesize import format_size
+from tvlinker.filters import in_ranges, match_fields
+from tvlinker.releasename import episode_key, normalize, parse_release, variant_key
+from tvlinker.timestamps import format_timestamp
+
+
+class ReleaseModel(QAbstractTableModel):
+    headers = ('DATE', 'URL', 'DESCRIPTION', 'SIZE')
+    moreRequested = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super(ReleaseModel, self).__init__(parent)
+        # set by the owner while further listing pages can be requested through fetchMore
+        self.more_pages = False
+        self.releases = []
+        self.url_rows = {}
+        self.variant_rows = {}
+        self.search_texts = []
+        self.names = []
+        self.show_keys = []
+        self.indexes = {}
+        self.font = QFont('Open Sans', weight=QFont.Normal)
+        if sys.platform == 'win32':
+            self.title_font = QFont('Open Sans Semibold', pointSize=10)
+        elif sys.platform == 'darwin':
+            self.title_font = QFont('Open Sans Bold', weight=QFont.Bold)
+        else:
+            self.title_font = QFont('Open Sans', weight=QFont.DemiBold, pointSize=10)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.releases)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.headers)
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and self.more_pages
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:
+        # rows arrive through merge_release once the owner has scraped the page
+        if self.canFetchMore(parent):
+            self.more_pages = False
+            self.moreRequested.emit()
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        column = index.column()
+        if role == Qt.DisplayRole:
+            value = self.releases[index.row()][column]
+            if column == 0:
+                return format_timestamp(value)
+            elif column == 3:
+                return format_size(value) if value else ''
+            return '  %s' % value if column == 2 else value
+        elif role == Qt.UserRole:
+            return self.releases[index.row()][column]
+        elif role == Qt.FontRole:
+            return self.title_font if column == 2 else self.font
+        elif role == Qt.TextAlignmentRole and column in (0, 3):
+            return Qt.AlignCenter
+        return None
+
+    @staticmethod
+    def dedupe(releases: list) -> list:
+        """Keep one release per post URL and per variant, preferring the latest post of a variant."""
+        latest = {}
+        for release in releases:
+            key = variant_key(release[2])
+            if key not in latest or release[0] > latest[key][0]:
+                latest[key] = release
+        urls = {release[1] for release in latest.values()}
+        deduped = []
+        for release in releases:
+            if release[1] in urls:
+                urls.discard(release[1])
+                deduped.append(list(release))
+        return deduped
+
+    def set_releases(self, releases: list) -> None:
+        self.beginResetModel()
+        self.releases = self.dedupe(releases)
+        self.url_rows = {release[1]: row for row, release in enumerate(self.releases)}
+        self.variant_rows = {variant_key(release[2]): row for row, release in enumerate(self.releases)}
+        self.search_texts = [self.format_search_text(release) for release in self.releases]
+        self.names = [parse_release(release[2]) for release in self.releases]
+        self.show_keys = [normalize(name.show) for name in self.names]
+        self.indexes = {}
+        self.endResetModel()
+
+    def merge_release(self, release: list) -> bool:
+        """Insert a new release or update an existing one in place, keyed by its post URL.
+
+        A repack or proper posted under a new URL replaces the row of the release it fixes, and an older
+        post of a variant already listed is dropped. Returns False if nothing changed.
+        """
+        row = self.url_rows.get(release[1])
+        if row is None:
+            key = variant_key(release[2])
+            row = self.variant_rows.get(key)
+            if row is not None:
+                if self.releases[row][0] > release[0]:
+                    return False
+                del self.url_rows[self.releases[row][1]]
+                self.url_rows[release[1]] = row
+        if row is None:
+            row = len(self.releases)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.releases.append(list(release))
+            self.url_rows[release[1]] = row
+            self.variant_rows[key] = row
+            self.search_texts.append(self.format_search_text(release))
+            self.names.append(parse_release(release[2]))
+            self.show_keys.append(normalize(self.names[row].show))
+            self.indexes = {}
+            self.endInsertRows()
+            return True
+        if self.releases[row] == release:
+            return False
+        if self.releases[row][2] != release[2]:
+            self.variant_rows.pop(variant_key(self.releases[row][2]), None)
+            self.variant_rows[variant_key(release[2])] = row
+        self.releases[row] = list(release)
+        self.search_texts[row] = self.format_search_text(release)
+        self.names[row] = parse_release(release[2])
+        self.show_keys[row] = normalize(self.names[row].show)
+        self.indexes = {}
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+        return True
+
+    @staticmethod
+    def format_search_text(release: list) -> str:
+        return '\n'.join((format_timestamp(release[0]), release[1], release[2], format_size(release[3]))).lower()
+
+    def search_text(self, row: int) -> str:
+        return self.search_texts[row]
+
+    def sorted_index(self, column: int) -> tuple:
+        """Column values in ascending order alongside their rows, rebuilt after the releases change."""
+        if column not in self.indexes:
+            rows = sorted(range(len(self.releases)), key=lambda row: self.releases[row][column])
+            self.indexes[column] = ([self.releases[row][column] for row in rows], rows)
+        return self.indexes[column]
+
+    def rows_in_range(self, column: int, low=None, high=None) -> set:
+        """Rows whose value in column lies within the inclusive bounds, found by binary search."""
+        values, rows = self.sorted_index(column)
+        start = 0 if low is None else bisect_left(values, low)
+        end = len(values) if high is None else bisect_right(values, high)
+        return set(rows[start:end])
+
+    def in_ranges(self, row: int, ranges: dict) -> bool:
+        return in_ranges(self.releases[row], ranges)
+
+    def matches_fields(self, row: int, fields: dict) -> bool:
+        return match_fields(self.names[row], fields, self.show_keys[row])
+
+    def matches_favorite(self, row: int, favorites: list) -> bool:
+        """Whether the parsed show name of row contains any of the normalised favorites."""
+        show = self.show_keys[row]
+        return any(fave in show for fave in favorites)
+
+    def retain_releases(self, urls: set) -> None:
+        """Drop every release whose post URL is not in urls."""
+        # urls can also hold variants the merge dropped, so equal counts say nothing about the releases
+        if not any(release[1] not in urls for release in self.releases):
+            return
+        self.set_releases([release for release in self.releases if release[1] in urls])
+
+    def release_model(self) -> QAbstractTableModel:
+        return self
+
+    def release_rows(self, row: int, parent: QModelIndex = QModelIndex()) -> list:
+        return [row]
+
+
+class EpisodeGroupModel(QAbstractItemModel):
+    """Releases of a ReleaseModel grouped by show and episode.
+
+    Top level rows stand for an episode and show its latest release. The releases of an episode only become
+    child rows once the view asks to fetch them, which it does when the group is expanded.
+    """
+    def __init__(self, source: ReleaseModel, parent=None):
+        super(EpisodeGroupModel, self).__init__(parent)
+        self.source = source
+        self.groups = []
+        self.group_keys = {}
+        self.row_groups = {}
+        self.fetched = []
+        source.modelReset.connect(self.rebuild)
+        source.rowsInserted.connect(self.insert_releases)
+        source.dataChanged.connect(self.update_releases)
+        self.rebuild()
+
+    @pyqtSlot()
+    def rebuild(self) -> None:
+        self.beginResetModel()
+        self.groups, self.group_keys, self.row_groups, self.fetched = [], {}, {}, []
+        for row in range(self.source.rowCount()):
+            key = episode_key(self.source.releases[row][2])
+            if key not in self.group_keys:
+                self.add_group(key)
+            self.add_child(self.group_keys[key], row)
+        self.endResetModel()
+
+    def add_group(self, key: str) -> int:
+        self.group_keys[key] = len(self.groups)
+        self.groups.append([])
+        self.fetched.append(0)
+        return self.group_keys[key]
+
+    def add_child(self, group: int, row: int) -> None:
+        self.groups[group].append(row)
+        self.row_groups[row] = group
+
+    @pyqtSlot(QModelIndex, int, int)
+    def insert_releases(self, parent: QModelIndex, first: int, last: int) -> None:
+        new_keys, new_rows, grown = [], {}, []
+        for row in range(first, last + 1):
+            key = episode_key(self.source.releases[row][2])
+            if key in self.group_keys:
+                grown.append((self.group_keys[key], row))
+            else:
+                if key not in new_rows:
+                    new_keys.append(key)
+                new_rows.setdefault(key, []).append(row)
+        if len(new_keys):
+            count = len(self.groups)
+            self.beginInsertRows(QModelIndex(), count, count + len(new_keys) - 1)
+            for key in new_keys:
+                group = self.add_group(key)
+                for row in new_rows[key]:
+                    self.add_child(group, row)
+            self.endInsertRows()
+        for group, row in grown:
+            if self.fetched[group]:
+                # the group is expanded already, so the release shows up as a new child straight away
+                child = len(self.groups[group])
+                self.beginInsertRows(self.index(group, 0), child, child)
+                self.add_child(group, row)
+                self.fetched[group] = child + 1
+                self.endInsertRows()
+            else:
+                self.add_child(group, row)
+            self.emit_group_changed(group)
+
+    @pyqtSlot(QModelIndex, QModelIndex)
+    def update_releases(self, top_left: QModelIndex, bottom_right: QModelIndex) -> None:
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            group = self.row_groups.get(row)
+            if group is not None:
+                self.emit_group_changed(group)
+
+    def emit_group_changed(self, group: int) -> None:
+        self.dataChanged.emit(self.index(group, 0), self.index(group, self.columnCount() - 1))
+
+    def release_model(self) -> ReleaseModel:
+        return self.source
+
+    def release_rows(self, row: int, parent: QModelIndex = QModelIndex()) -> list:
+        if parent.isValid():
+            return [self.groups[parent.row()][row]]
+        return self.groups[row]
+
+    def latest_row(self, group: int) -> int:
+        return max(self.groups[group], key=lambda row: self.source.releases[row][0])
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        # top level indexes carry 0, children carry their group number plus one
+        return self.createIndex(row, column, parent.row() + 1 if parent.isValid() else 0)
+
+    def parent(self, index: QModelIndex) -> QModelIndex:
+        if not index.isValid() or index.internalId() == 0:
+            return QModelIndex()
+        return self.createIndex(index.internalId() - 1, 0, 0)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if not parent.isValid():
+            return len(self.groups)
+        if parent.internalId() == 0 and parent.column() == 0:
+            return self.fetched[parent.row()]
+        return 0
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return len(self.source.headers)
+
+    def hasChildren(self, parent: QModelIndex = QModelIndex()) -> bool:
+        if not parent.isValid():
+            return len(self.groups) > 0
+        return parent.internalId() == 0 and parent.column() == 0 and len(self.groups[parent.row()]) > 1
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        if not parent.isValid():
+            return self.source.canFetchMore(QModelIndex())
+        elif parent.internalId() != 0:
+            return False
+        group = parent.row()
+        return len(self.groups[group]) > 1 and self.fetched[group] < len(self.groups[group])
+
+    def fetchMore(self, parent: QModelIndex) -> None:
+        if not parent.isValid():
+            self.source.fetchMore(QModelIndex())
+            return
+        group = parent.row()
+        self.beginInsertRows(parent, self.fetched[group], len(self.groups[group]) - 1)
+        self.fetched[group] = len(self.groups[group])
+        self.endInsertRows()
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole):
+        return self.source.headerData(section, orientation, role)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        column = index.column()
+        if index.internalId() != 0:
+            row = self.groups[index.internalId() - 1][index.row()]
+            return self.source.data(self.source.index(row, column), role)
+        rows = self.groups[index.row()]
+        latest = self.latest_row(index.row())
+        if len(rows) == 1 or column in (0, 1):
+            return self.source.data(self.source.index(latest, column), role)
+        if column == 2 and role in (Qt.DisplayRole, Qt.UserRole):
+            name = self.source.names[latest]
+            label = name.show
+            if name.season is not None:
+                label += ' S%02d' % name.season + ('E%02d' % name.episode if name.episode is not None else '')
+            if role == Qt.UserRole:
+                return label
+            return '  %s  (%i releases)' % (label, len(rows))
+        if column == 3 and role in (Qt.DisplayRole, Qt.UserRole):
+            sizes = [self.source.releases[row][3] for row in rows]
+            if role == Qt.UserRole:
+                return max(sizes)
+            return '%s - %s' % (format_size(min(sizes)), format_size(max(sizes)))
+        return self.source.data(self.source.index(latest, column), role)
+
+
+class ReleaseFilterProxy(QSortFilterProxyModel):
+    def __init__(self, parent=None):
+        super(ReleaseFilterProxy, self).__init__(parent)
+        self.filters = []
+        self.ranges = {}
+        self.fields = {}
+        self.favorites = []
+        self.matches = None
+        self.matched_rows = 0
+        self.setDynamicSortFilter(False)
+        self.setSortRole(Qt.UserRole)
+
+    def setSourceModel(self, model: QAbstractItemModel) -> None:
+        """Accepts a ReleaseModel or an EpisodeGroupModel over one; filters always test the releases.
+
+        Grouping episodes swaps the source back and forth over the same releases:
+
+        >>> releases = ReleaseModel()
+        >>> proxy = ReleaseFilterProxy()
+        >>> for source in (releases, EpisodeGroupModel(releases), releases, EpisodeGroupModel(releases)):
+        ...     proxy.setSourceModel(source)
+        >>> proxy.set_filters(['simpsons'])
+        >>> proxy.matches = set()
+        >>> releases.set_releases([[1500000000, 'a.html', 'The.Simpsons.S31E01.720p.HDTV.x264-AVS', 1024]])
+        >>> proxy.matches is None, proxy.rowCount()
+        (True, 1)
+
+        """
+        previous = self.sourceModel()
+        if previous is not None:
+            # the release model stays the same when the grouping is toggled, so connect its reset only once
+            previous.release_model().modelAboutToBeReset.disconnect(self.clear_matches)
+        super(ReleaseFilterProxy, self).setSourceModel(model)
+        self.matches = None
+        model.release_model().modelAboutToBeReset.connect(self.clear_matches)
+
+    @pyqtSlot()
+    def clear_matches(self) -> None:
+        self.matches = None
+
+    def set_filters(self, filters: list, ranges: dict = None, fields: dict = None, favorites: list = None) -> None:
+        """Filter on any of the substrings in filters, all of the column ranges and release name fields, and
+        any of the favorite shows."""
+        self.filters = [term.lower() for term in filters if len(term)]
+        self.ranges = ranges or {}
+        self.fields = fields or {}
+        self.favorites = [normalize(fave) for fave in favorites or [] if len(fave)]
+        self.matches = None
+        self.invalidateFilter()
+
+    def range_matches(self) -> set:
+        # intersect the smallest sets first so compound ranges stay cheap
+        model = self.sourceModel().release_model()
+        if self.matches is None:
+            matches = sorted((model.rows_in_range(column, *bounds) for column, bounds in self.ranges.items()), key=len)
+            self.matches = set.intersection(*matches)
+            self.matched_rows = model.rowCount()
+        return self.matches
+
+    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        if not (len(self.ranges) or len(self.fields) or len(self.favorites) or len(self.filters)):
+            return True
+        rows = self.sourceModel().release_rows(source_row, source_parent)
+        return any(self.accepts_release(row) for row in rows)
+
+    def accepts_release(self, row: int) -> bool:
+        model = self.sourceModel().release_model()
+        if len(self.ranges):
+            if row >= self.matched_rows and self.matches is not None:
+                # rows added since the ranges were resolved are checked directly
+                if not model.in_ranges(row, self.ranges):
+                    return False
+            elif row not in self.range_matches():
+                return False
+        if len(self.fields) and not model.matches_fields(row, self.fields):
+            return False
+        if len(self.favorites) and not model.matches_favorite(row, self.favorites):
+            return False
+        if not len(self.filters):
+            return True
+        haystack = model.search_text(row)
+        return any(term in haystack for term in self.filters)
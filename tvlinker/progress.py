@@ -10,8 +10,14 @@ class TaskbarProgress(QWidget):
     def __init__(self, parent=None):
         super(TaskbarProgress, self).__init__(parent)
         self._desktopfile = 'application://{}.desktop'.format(qApp.applicationName().lower())
+        self._sessionbus = None
+        self._state = (0.0, False)
+
+    @pyqtSlot()
+    def init(self):
+        # the session bus connection is deferred until after the main window has been painted
         self._sessionbus = QDBusConnection.sessionBus()
-        self.clear()
+        self.setProgress(*self._state)
 
     @pyqtSlot()
     def clear(self):
@@ -19,6 +25,9 @@ class TaskbarProgress(QWidget):
 
     @pyqtSlot(float, bool)
     def setProgress(self, value: float, visible: bool=True):
+        self._state = (value, visible)
+        if self._sessionbus is None:
+            return
         signal = QDBusMessage.createSignal('/com/canonical/unity/launcherentry/337963624',
                                            'com.canonical.Unity.LauncherEntry', 'Update')
         message = signal << self._desktopfile << {'progress-visible': visible, 'progress': value}
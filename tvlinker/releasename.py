@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+ReleaseName = namedtuple('ReleaseName', 'show season episode resolution source group')
+
+_separators = re.compile(r'[\s._]+')
+_repack_tags = re.compile(r' (?:repack\d*|proper|real|rerip|dirfix|nfofix|readnfo)(?= )')
+_episode = re.compile(r' (?:s\d{1,2}(?:e\d{1,3})+|\d{1,2}x\d{2,3}|\d{4} \d{2} \d{2}|s\d{1,2})(?= |$)')
+_group = re.compile(r'-([^ -]+)$')
+_season_episode = re.compile(r' (?:s(\d{1,2})(?:e(\d{1,3}))?(?:-?e\d{1,3})*|(\d{1,2})x(\d{2,3}))(?= |$)',
+                             re.IGNORECASE)
+_air_date = re.compile(r' \d{4} \d{2} \d{2}(?= |$)')
+_resolution = re.compile(r' (\d{3,4}[pi]|4k|uhd)(?= |-|$)', re.IGNORECASE)
+_source = re.compile(r' (web-?dl|web-?rip|web|hdtv|pdtv|sdtv|dsr|bluray|bdrip|brrip|dvdrip|hdrip)(?= |-|$)',
+                     re.IGNORECASE)
+
+
+def normalize(text: str) -> str:
+    """Lowercase text with runs of dots, underscores and spaces collapsed to a single space.
+
+    >>> normalize('The.Big_Bang  Theory')
+    'the big bang theory'
+
+    """
+    return _separators.sub(' ', text.lower()).strip()
+
+
+@lru_cache(maxsize=4096)
+def variant_key(title: str) -> str:
+    """Release title with separators, case and repack tags normalised away.
+
+    A repack or proper of a release shares the key of the release it fixes::
+
+    >>> variant_key('Show.Name.S01E02.REPACK.720p.HDTV.x264-KILLERS')
+    'show name s01e02 720p hdtv x264-killers'
+    >>> variant_key('Show Name S01E02 720p HDTV x264-KILLERS')
+    'show name s01e02 720p hdtv x264-killers'
+    >>> variant_key('Show_Name_S01E02_PROPER_REAL_1080p_WEB_h264-TBS')
+    'show name s01e02 1080p web h264-tbs'
+
+    """
+    key = ' %s ' % normalize(title)
+    while True:
+        stripped = _repack_tags.sub('', key)
+        if stripped == key:
+            return key.strip()
+        key = stripped
+
+
+@lru_cache(maxsize=4096)
+def episode_key(title: str) -> str:
+    """Show and episode part of a release title, shared by every quality and group of that episode.
+
+    >>> episode_key('Show.Name.S01E02.720p.HDTV.x264-KILLERS')
+    'show name s01e02'
+    >>> episode_key('Show.Name.S01E02.REPACK.1080p.WEB.h264-TBS')
+    'show name s01e02'
+    >>> episode_key('Daily.Show.2020.01.15.Guest.720p.WEB.x264-TRUMP')
+    'daily show 2020 01 15'
+    >>> episode_key('Some.Documentary.720p.HDTV.x264-GRP')
+    'some documentary 720p hdtv x264'
+
+    """
+    key = variant_key(title)
+    m = _episode.search(key)
+    if m is not None:
+        return key[:m.end()].strip()
+    return _group.sub('', key)
+
+
+@lru_cache(maxsize=4096)
+def parse_release(title: str) -> ReleaseName:
+    """Structured fields of a scene release title; fields that cannot be found are None.
+
+    >>> parse_release('The.Big.Bang.Theory.S12E03.720p.HDTV.x264-AVS')
+    ReleaseName(show='The Big Bang Theory', season=12, episode=3, resolution='720p', source='hdtv', group='AVS')
+    >>> parse_release('Show.Name.2x05.WEB-DL.1080p-GRP')
+    ReleaseName(show='Show Name', season=2, episode=5, resolution='1080p', source='web-dl', group='GRP')
+    >>> parse_release('Daily.Show.2020.01.15.Guest.720p.WEB.x264-TRUMP')
+    ReleaseName(show='Daily Show', season=None, episode=None, resolution='720p', source='web', group='TRUMP')
+    >>> parse_release('Show.S03.1080p.BluRay.x264-ROVERS').season
+    3
+    >>> parse_release('Some Documentary')
+    ReleaseName(show='Some Documentary', season=None, episode=None, resolution=None, source=None, group=None)
+
+    """
+    text = ' %s' % _separators.sub(' ', title).strip()
+    season = episode = None
+    marker = _season_episode.search(text)
+    if marker is not None:
+        season = int(marker.group(1) or marker.group(3))
+        if marker.group(2) or marker.group(4):
+            episode = int(marker.group(2) or marker.group(4))
+    else:
+        marker = _air_date.search(text)
+    resolution = _resolution.search(text)
+    source = _source.search(text)
+    group = _group.search(text)
+    if marker is not None:
+        show = text[:marker.start()]
+    else:
+        ends = [m.start() for m in (resolution, source, group) if m is not None]
+        show = text[:min(ends)] if len(ends) else text
+    return ReleaseName(show.strip(), season, episode,
+                       resolution.group(1).lower() if resolution is not None else None,
+                       source.group(1).lower() if source is not None else None,
+                       group.group(1) if group is not None else None)
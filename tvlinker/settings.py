@@ -7,7 +7,7 @@ from PyQt5.QtCore import pyqtSlot, QSettings, QSize, Qt
 from PyQt5.QtGui import QCloseEvent, QIcon, QKeyEvent, QPixmap
 from PyQt5.QtWidgets import (QAbstractItemView, QCheckBox, QComboBox, QDialog, QDialogButtonBox, QFormLayout,
                              QGroupBox, QHBoxLayout, QLabel, QLineEdit, QListWidget, QListWidgetItem, QPushButton,
-                             QSizePolicy, QStackedWidget, QTabWidget, QVBoxLayout, QWidget, qApp)
+                             QSizePolicy, QSpinBox, QStackedWidget, QTabWidget, QVBoxLayout, QWidget, qApp)
 
 
 class Settings(QDialog):
@@ -251,6 +251,17 @@ class FavoritesTab(QWidget):
         faves_formLayout.addRow('Item Label:', self.faves_lineEdit)
         faves_formLayout.addRow(faves_buttonLayout)
         faves_formLayout.addRow(self.get_notes())
+        self.watch_checkBox = QCheckBox('Download new episodes automatically', self, cursor=Qt.PointingHandCursor,
+                                        checked=self.settings.value('watch_favorites', False, bool))
+        self.watchinterval_spinBox = QSpinBox(self, minimum=5, maximum=1440, suffix=' mins',
+                                              value=self.settings.value('watch_interval', 15, int))
+        self.watchresolution_comboBox = QComboBox(self, editable=False, cursor=Qt.PointingHandCursor)
+        self.watchresolution_comboBox.addItems(('any', '480p', '720p', '1080p', '2160p'))
+        self.watchresolution_comboBox.setCurrentIndex(max(0, self.watchresolution_comboBox.findText(
+            str(self.settings.value('watch_resolution') or 'any'), Qt.MatchFixedString)))
+        faves_formLayout.addRow(self.watch_checkBox)
+        faves_formLayout.addRow('Check Every:', self.watchinterval_spinBox)
+        faves_formLayout.addRow('Quality:', self.watchresolution_comboBox)
         self.faves_listWidget = QListWidget(self)
         self.faves_listWidget.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.faves_listWidget.setSortingEnabled(True)
@@ -298,3 +309,7 @@ class FavoritesTab(QWidget):
             for row in range(0, self.faves_listWidget.count()):
                 faves.append(self.faves_listWidget.item(row).text())
             self.settings.setValue('favorites', faves)
+        self.settings.setValue('watch_favorites', self.watch_checkBox.isChecked())
+        self.settings.setValue('watch_interval', self.watchinterval_spinBox.value())
+        resolution = self.watchresolution_comboBox.currentText()
+        self.settings.setValue('watch_resolution', resolution if resolution != 'any' else '')
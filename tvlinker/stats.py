@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from PyQt5.QtCore import QTimer, Qt, pyqtSlot
+from PyQt5.QtWidgets import (QDialog, QDialogButtonBox, QHeaderView, QLabel, QTableWidget, QTableWidgetItem,
+                             QVBoxLayout, qApp)
+
+from tvlinker.core.metrics import Metrics, metrics
+from tvlinker.filesize import format_size
+
+
+class StatsPanel(QDialog):
+    """Live per stage timings from the instrumentation layer, refreshed every second."""
+    headers = ('STAGE', 'COUNT', 'P50 (ms)', 'P95 (ms)', 'TOTAL (s)')
+
+    def __init__(self, parent=None, source: Metrics = metrics):
+        super(StatsPanel, self).__init__(parent, Qt.Tool)
+        self.source = source
+        self.setWindowTitle('%s - Performance' % qApp.applicationName())
+        self.table = QTableWidget(0, len(self.headers), self)
+        self.table.setHorizontalHeaderLabels(self.headers)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.counters = QLabel(self, textFormat=Qt.RichText)
+        buttons = QDialogButtonBox(QDialogButtonBox.Reset | QDialogButtonBox.Close, self)
+        buttons.rejected.connect(self.close)
+        buttons.button(QDialogButtonBox.Reset).clicked.connect(self.reset)
+        layout = QVBoxLayout()
+        layout.addWidget(self.table)
+        layout.addWidget(self.counters)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+        self.setMinimumSize(560, 320)
+        self.timer = QTimer(self, interval=1000, timeout=self.refresh)
+        self.refresh()
+
+    def showEvent(self, event) -> None:
+        self.timer.start()
+        super(StatsPanel, self).showEvent(event)
+
+    def hideEvent(self, event) -> None:
+        self.timer.stop()
+        super(StatsPanel, self).hideEvent(event)
+
+    @pyqtSlot()
+    def refresh(self) -> None:
+        stats = self.source.summary()
+        self.table.setRowCount(len(stats))
+        for row, stage in enumerate(sorted(stats)):
+            values = stats[stage]
+            cells = (stage, '%i' % values['count'], '%.1f' % values['p50'], '%.1f' % values['p95'],
+                     '%.2f' % (values['total'] / 1000))
+            for column, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if column:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+        counters = sorted(self.source.counters.items())
+        self.counters.setText('&nbsp;&nbsp;'.join(
+            '%s: <b>%s</b>' % (name, format_size(value) if name.endswith('.bytes') else value)
+            for name, value in counters))
+
+    @pyqtSlot()
+    def reset(self) -> None:
+        self.source.reset()
+        self.refresh()
@@ -1,113 +1,93 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os
+import heapq
+import itertools
 import sys
-import time
-
-from datetime import datetime, timedelta
-from tzlocal import get_localzone
-
-import pytz
-import requests
+import traceback
+from collections import OrderedDict
 
 from PyQt5.QtCore import QObject, QSettings, QThread, pyqtSignal, pyqtSlot
-from PyQt5.QtWidgets import QMessageBox, qApp
-from bs4 import BeautifulSoup
-from requests.exceptions import HTTPError
-
-import cloudscraper
-
+from PyQt5.QtWidgets import qApp
+
+from tvlinker.core.cancel import CancelToken, Cancelled
+from tvlinker.core.downloads import Transfer, hoster_speeds
+from tvlinker.core.managers import aria2_add_uri
+from tvlinker.core.metrics import metrics
+from tvlinker.core.profiling import profiled
+from tvlinker.core.proxies import ShadowSocks
+from tvlinker.core.realdebrid import RealDebridClient
+from tvlinker.core.schedule import PollScheduler
+from tvlinker.core.scraper import Scraper
+from tvlinker.core.watcher import FavoritesWatcher
 from tvlinker.filesize import alternative, size
-
-try:
-    # noinspection PyPackageRequirements
-    import simplejson as json
-except ImportError:
-    import json
-
-
-class ShadowSocks:
-    config = {
-        'ssocks': {
-            'procs': ['ss-qt5', 'sslocal'],
-            'proxies': {
-                'http': 'socks5://127.0.0.1:1080',
-                'https': 'socks5://127.0.0.1:1080'
-            },
-        },
-        'v2ray': {
-            'procs': ['v2ray'],
-            'proxies': {
-                'http': 'socks5://127.0.0.1:10808',
-                'https': 'socks5://127.0.0.1:10808'
-            }
-        }
-    }
-
-    @staticmethod
-    def detect() -> str:
-        if sys.platform.startswith('linux'):
-            ptypes = ShadowSocks.config.keys()
-            ps = os.popen('ps -Af').read()
-            for ptype in ptypes:
-                procs = ShadowSocks.config[ptype]['procs']
-                for p in procs:
-                    if ps.count(p):
-                        return ptype
-        return None
-
-    @staticmethod
-    def proxies() -> dict:
-        proxy_type = ShadowSocks.detect()
-        return ShadowSocks.config[proxy_type]['proxies'] if proxy_type is not None else {}
+from tvlinker.timestamps import SOURCE_TIMEZONE
+import tvlinker.hostnames as hostnames
 
 
 class ScrapeWorker(QObject):
-    addRow = pyqtSignal(list)
+    addRow = pyqtSignal(int, list)
     workFinished = pyqtSignal()
+    workStopped = pyqtSignal()
+    scrapeFailed = pyqtSignal(str)
+    listingEnded = pyqtSignal(int)
 
-    def __init__(self, source_url: str, useragent: str, maxpages: int):
+    def __init__(self, source_url: str, useragent: str, maxpages: int, source_tz: str = SOURCE_TIMEZONE,
+                 pages: dict = None, first_page: int = 0):
         super(ScrapeWorker, self).__init__()
+        # read before every page, so the GUI thread can raise it while the scrape runs
         self.maxpages = maxpages
+        self.first_page = first_page
         self.source_url = source_url
         self.user_agent = useragent
-        self.scraper = cloudscraper.create_scraper()
-        self.scraper.proxies = ShadowSocks.proxies()
-        self.tz_format = '%b %d %Y %H:%M'
-        self.tz_local = get_localzone()
+        self.scraper = Scraper(source_url, useragent, source_tz)
+        self.source_tz = source_tz
         self.complete = False
+        # rows of the pages fetched so far by page number, shared with the GUI to extend or trim the listing
+        self.pages = pages if pages is not None else {}
+        self.token = CancelToken()
+        self.token.on_cancel(self.scraper.close)
+
+    def cancel(self) -> None:
+        """Called from the GUI thread: stop at the next page or post and abort the request in flight."""
+        self.token.cancel()
 
     def scrape(self, pagenum: int) -> None:
-        try:
-            url = self.source_url.format(pagenum + 1)
-            req = self.scraper.get(url)
-            bs = BeautifulSoup(req.text, 'lxml')
-            posts = bs('div', class_='post')
-            for post in posts:
-                dt_utc = datetime.strptime(post.find('div', class_='p-c p-c-time').get_text().strip(), self.tz_format)
-                # TODO: fix hardcoded DST adjustment
-                dt_local = dt_utc.replace(tzinfo=pytz.utc).astimezone(self.tz_local) - timedelta(hours=2)
-                dlsize = post.find('h2').get_text().strip()
-                table_row = [
-                    dt_local.strftime(self.tz_format),
-                    post.find('a', class_='p-title').get('href').strip(),
-                    post.find('a', class_='p-title').get_text().strip(),
-                    dlsize[dlsize.rfind('(') + 1:len(dlsize) - 1]
-                ]
-                self.addRow.emit(table_row)
-        except HTTPError:
-            sys.stderr.write(sys.exc_info()[0])
-            # noinspection PyTypeChecker
-            QMessageBox.critical(None, 'ERROR NOTIFICATION', sys.exc_info()[0])
-            # self.exit()
+        with metrics.timer('scrape.page', page=pagenum) as fields:
+            rows = self.scraper.scrape_page(pagenum, self.token)
+            fields['rows'] = len(rows)
+        for table_row in rows:
+            self.token.check()
+            self.addRow.emit(pagenum, table_row)
+        # only pages whose rows all went out count as fetched
+        self.pages[pagenum] = rows
+        if not self.scraper.listed:
+            self.listingEnded.emit(pagenum)
 
     @pyqtSlot()
+    @profiled('scrape')
     def begin(self):
-        for page in range(self.maxpages):
-            if QThread.currentThread().isInterruptionRequested():
+        from requests import RequestException
+        self.scraper.reset()
+        for rows in list(self.pages.values()):
+            self.scraper.seen_urls.update(row[1] for row in rows)
+        page = self.first_page
+        try:
+            while page < self.maxpages:
+                self.token.check()
+                self.scrape(page)
+                page += 1
+        except Exception as e:
+            # whatever a closed session raises mid-request counts as the cancellation it was caused by
+            if self.token.cancelled:
+                self.workStopped.emit()
                 return
-            self.scrape(page)
+            # PyQt aborts the app on an exception escaping a slot, so a failed scrape is reported instead
+            if not isinstance(e, (RequestException, OSError)):
+                traceback.print_exc()
+            self.scraper.close()
+            self.scrapeFailed.emit('%s: %s' % (type(e).__name__, e))
+            return
         self.complete = True
         self.workFinished.emit()
 
@@ -115,53 +95,182 @@ class ScrapeWorker(QObject):
 class HostersThread(QThread):
     setHosters = pyqtSignal(list)
     noLinks = pyqtSignal()
+    fetchFailed = pyqtSignal(str)
 
-    def __init__(self, link_url: str, useragent: str):
+    def __init__(self, link_url: str, useragent: str, scraper: Scraper = None):
         QThread.__init__(self)
         self.link_url = link_url
         self.user_agent = useragent
-        self.scraper = cloudscraper.create_scraper()
-        self.scraper.proxies = ShadowSocks.proxies()
+        self.scraper = scraper or Scraper(useragent=useragent)
 
     def __del__(self) -> None:
         self.wait()
 
     def get_hoster_links(self) -> None:
+        from requests import RequestException
         try:
-            req = self.scraper.get(self.link_url)
-            bs = BeautifulSoup(req.text, 'lxml')
-            links = bs.select('div.post h2[style="text-align: center;"]')
-            self.setHosters.emit(links)
-        except HTTPError:
-            print(sys.exc_info()[0])
-            # noinspection PyTypeChecker
-            QMessageBox.critical(None, 'ERROR NOTIFICATION', sys.exc_info()[0])
-            QThread.currentThread().quit()
-        except IndexError:
+            releases = self.scraper.get_hosters(self.link_url)
+        except Exception as e:
+            # Cloudflare challenges fail with cloudscraper's own exceptions besides the requests ones
+            if not isinstance(e, (RequestException, OSError)):
+                traceback.print_exc()
+            self.fetchFailed.emit('%s: %s' % (type(e).__name__, e))
+            return
+        if len(releases):
+            self.setHosters.emit(releases)
+        else:
             self.noLinks.emit()
-            QThread.currentThread().quit()
 
     def run(self) -> None:
         self.get_hoster_links()
 
 
+class WatchThread(QThread):
+    releasesFound = pyqtSignal(list)
+    releasesQueued = pyqtSignal(list)
+    downloadLink = pyqtSignal(str)
+
+    def __init__(self, watcher: FavoritesWatcher, scheduler: PollScheduler):
+        QThread.__init__(self)
+        self.watcher = watcher
+        # built-in downloads are started by the GUI in a DownloadThread, with progress and cancel
+        self.watcher.downloader = self.downloadLink.emit
+        self.scheduler = scheduler
+
+    def __del__(self) -> None:
+        self.wait()
+
+    @profiled('watch')
+    def run(self) -> None:
+        from requests import RequestException
+        try:
+            rows, queued = self.watcher.poll()
+        except Cancelled:
+            return
+        except Exception as e:
+            if self.watcher.token.cancelled:
+                return
+            # HTTP error statuses and Cloudflare failures back off as errors, not as polls that found nothing
+            if not isinstance(e, (RequestException, OSError, ValueError)):
+                traceback.print_exc()
+            print(sys.exc_info())
+            self.scheduler.record_error()
+            return
+        self.scheduler.record([row[0] for row in rows])
+        if len(rows):
+            self.releasesFound.emit(rows)
+        if len(queued):
+            self.releasesQueued.emit([list(item) for item in queued])
+
+
+class HosterPrefetcher(QObject):
+    hostersReady = pyqtSignal(str, list)
+    noLinks = pyqtSignal(str)
+    fetchFailed = pyqtSignal(str, str)
+
+    REQUESTED, FAVORITE, VISIBLE = range(3)
+
+    def __init__(self, useragent: str, maxthreads: int = 3, maxqueue: int = 60, maxcache: int = 300, parent=None):
+        super(HosterPrefetcher, self).__init__(parent)
+        self.user_agent = useragent
+        self.maxthreads = maxthreads
+        self.maxqueue = maxqueue
+        self.maxcache = maxcache
+        # one session and its connection pool for all fetch threads, rather than a Cloudflare handshake each
+        self.scraper = Scraper(useragent=useragent)
+        self.cache = OrderedDict()
+        self.queue = []
+        self.queued = {}
+        self.active = {}
+        self.counter = itertools.count()
+
+    def enqueue(self, url: str, priority: int) -> None:
+        if url in self.cache or url in self.active:
+            return
+        entry = self.queued.get(url)
+        if entry is not None:
+            if entry[0] <= priority:
+                return
+            entry[-1] = None
+        entry = [priority, next(self.counter), url]
+        self.queued[url] = entry
+        heapq.heappush(self.queue, entry)
+        if len(self.queued) > self.maxqueue:
+            self.discard(max(self.queued.values())[-1])
+        self.dispatch()
+
+    def discard(self, url: str) -> None:
+        entry = self.queued.pop(url, None)
+        if entry is not None:
+            entry[-1] = None
+
+    def retain(self, urls: set, priority: int) -> None:
+        """Cancel queued fetches of the given priority whose URL is no longer in urls."""
+        for url, entry in list(self.queued.items()):
+            if entry[0] == priority and url not in urls:
+                self.discard(url)
+
+    def clear(self) -> None:
+        self.queue, self.queued = [], {}
+
+    def dispatch(self) -> None:
+        while len(self.active) < self.maxthreads and len(self.queue):
+            url = heapq.heappop(self.queue)[-1]
+            if url is None:
+                continue
+            del self.queued[url]
+            thread = HostersThread(url, self.user_agent, self.scraper)
+            thread.setHosters.connect(self.fetched)
+            thread.noLinks.connect(self.no_links)
+            thread.fetchFailed.connect(self.failed)
+            thread.finished.connect(self.finished)
+            self.active[url] = thread
+            thread.start()
+
+    @pyqtSlot(list)
+    def fetched(self, releases: list) -> None:
+        url = self.sender().link_url
+        self.cache[url] = releases
+        while len(self.cache) > self.maxcache:
+            self.cache.popitem(last=False)
+        self.hostersReady.emit(url, releases)
+
+    @pyqtSlot()
+    def no_links(self) -> None:
+        self.noLinks.emit(self.sender().link_url)
+
+    @pyqtSlot(str)
+    def failed(self, error: str) -> None:
+        self.fetchFailed.emit(self.sender().link_url, error)
+
+    @pyqtSlot()
+    def finished(self) -> None:
+        thread = self.active.pop(self.sender().link_url, None)
+        if thread is not None:
+            thread.deleteLater()
+        self.dispatch()
+
+
 class RealDebridThread(QThread):
     unrestrictedLink = pyqtSignal(str)
     supportedHosts = pyqtSignal(dict)
     hostStatus = pyqtSignal(dict)
+    linksChecked = pyqtSignal(list)
     errorMsg = pyqtSignal(list)
 
     class RealDebridAction:
         UNRESTRICT_LINK = 0,
         SUPPORTED_HOSTS = 1,
         HOST_STATUS = 2
+        CHECK_LINKS = 3
 
     def __init__(self,
                  settings: QSettings,
                  api_url: str,
                  link_url: str,
                  action: RealDebridAction = RealDebridAction.UNRESTRICT_LINK,
-                 check_host: str = None):
+                 check_host: str = None,
+                 links: list = None):
         QThread.__init__(self)
         self.api_url = api_url
         self.api_token = settings.value('realdebrid_apitoken')
@@ -169,16 +278,23 @@ class RealDebridThread(QThread):
         self.link_url = link_url
         self.action = action
         self.check_host = check_host
+        self.links = links or []
         self.proxies = ShadowSocks.proxies() if self.api_proxy else {}
+        self.client = RealDebridClient(api_url, self.api_token, self.proxies)
 
     def __del__(self):
         self.wait()
 
     def post(self, endpoint: str, payload: object = None) -> dict:
+        return self.request('POST', endpoint, payload)
+
+    def get(self, endpoint: str) -> dict:
+        return self.request('GET', endpoint)
+
+    def request(self, method: str, endpoint: str, payload: object = None) -> dict:
+        from requests.exceptions import HTTPError
         try:
-            res = requests.post('{0}{1}?auth_token={2}'.format(self.api_url, endpoint, self.api_token),
-                                data=payload, proxies=self.proxies)
-            return res.json()
+            return self.client.request(method, endpoint, payload)
         except HTTPError:
             print(sys.exc_info())
             self.errorMsg.emit([
@@ -210,11 +326,16 @@ class RealDebridThread(QThread):
     #     jsonres = self.post(endpoint='/hosts/status')
     #     self.hostStatus.emit(jsonres)
 
+    def check_links(self) -> None:
+        self.linksChecked.emit(self.client.check_links(self.links))
+
     def run(self) -> None:
         if self.action == RealDebridThread.RealDebridAction.UNRESTRICT_LINK:
             self.unrestrict_link()
         elif self.action == RealDebridThread.RealDebridAction.SUPPORTED_HOSTS:
             self.supported_hosts()
+        elif self.action == RealDebridThread.RealDebridAction.CHECK_LINKS:
+            self.check_links()
         # elif self.action == RealDebridThread.HOST_STATUS:
         #     self.host_status(self.check_host)
 
@@ -235,38 +356,8 @@ class Aria2Thread(QThread):
         self.wait()
 
     def add_uri(self) -> None:
-        user, passwd = '', ''
-        if len(self.rpc_username) > 0 and len(self.rpc_password) > 0:
-            user = self.rpc_username
-            passwd = self.rpc_password
-        elif len(self.rpc_secret) > 0:
-            user = 'token'
-            passwd = self.rpc_secret
-        aria2_endpoint = '%s:%s/jsonrpc' % (self.rpc_host, self.rpc_port)
-        headers = {'Content-Type': 'application/json'}
-        payload = json.dumps(
-            {
-                'jsonrpc': '2.0',
-                'id': 1,
-                'method': 'aria2.addUri',
-                'params': ['%s:%s' % (user, passwd), [self.link_url]]
-            },
-            sort_keys=False).encode('utf-8')
-        try:
-            from urllib.parse import urlencode
-            from urllib.request import Request, urlopen
-            req = Request(aria2_endpoint, headers=headers, data=payload)
-            res = urlopen(req).read().decode('utf-8')
-            jsonres = json.loads(res)
-            # res = requests.post(aria2_endpoint, headers=headers, data=payload)
-            # jsonres = res.json()
-            self.aria2Confirmation.emit('result' in jsonres.keys())
-        except HTTPError:
-            print(sys.exc_info())
-            # noinspection PyTypeChecker
-            QMessageBox.critical(None, 'ERROR NOTIFICATION', sys.exc_info(), QMessageBox.Ok)
-            self.aria2Confirmation.emit(False)
-            # self.exit()
+        self.aria2Confirmation.emit(aria2_add_uri(self.link_url, self.rpc_host, self.rpc_port, self.rpc_secret,
+                                                  self.rpc_username, self.rpc_password))
 
     def run(self) -> None:
         self.add_uri()
@@ -276,38 +367,97 @@ class DownloadThread(QThread):
     dlComplete = pyqtSignal()
     dlProgress = pyqtSignal(int)
     dlProgressTxt = pyqtSignal(str)
+    dlFailed = pyqtSignal(str)
+
+    # observed throughput in bytes/sec per hoster, shared with the Qt free core
+    hoster_speeds = hoster_speeds
 
     def __init__(self, link_url: str, dl_path: str):
         QThread.__init__(self)
         self.download_link = link_url
         self.download_path = dl_path
-        self.cancel_download = False
-        self.proxies = ShadowSocks.proxies()
+        self.transfer = Transfer(dl_path, ShadowSocks.proxies())
 
     def __del__(self) -> None:
         self.wait()
 
+    @property
+    def cancel_download(self) -> bool:
+        return self.transfer.cancelled
+
+    @cancel_download.setter
+    def cancel_download(self, cancelled: bool) -> None:
+        self.transfer.cancelled = cancelled
+
+    def fetch(self, link: str, min_speed: int = 0, hoster: str = None) -> str:
+        downloaded = self.transfer.downloaded
+        with metrics.timer('download', hoster=hoster) as fields:
+            fields['status'] = self.transfer.fetch(link, min_speed, hoster, self.report_progress)
+        metrics.count('download.bytes', max(0, self.transfer.downloaded - downloaded))
+        return fields['status']
+
+    def report_progress(self, downloaded: int, filesize: int, speed: float) -> None:
+        progress = float(downloaded) / filesize if filesize else 0
+        self.dlProgress.emit(progress * 100)
+        progressTxt = '<b>Downloading {0}</b>:<br/>{1} of <b>{3}</b> [{2:.2%}] [{4} kbps]' \
+            .format(self.transfer.filename, downloaded, progress, size(filesize, system=alternative), speed // 1000)
+        self.dlProgressTxt.emit(progressTxt)
+
     def download_file(self) -> None:
-        req = requests.get(self.download_link, stream=True, proxies=self.proxies)
-        filesize = int(req.headers['Content-Length'])
-        filename = os.path.basename(self.download_path)
-        downloadedChunk = 0
-        blockSize = 8192
-        start = time.clock()
-        with open(self.download_path, 'wb') as f:
-            for chunk in req.iter_content(chunk_size=blockSize):
-                if self.cancel_download or not chunk:
-                    req.close()
-                    break
-                f.write(chunk)
-                downloadedChunk += len(chunk)
-                progress = float(downloadedChunk) / filesize
-                self.dlProgress.emit(progress * 100)
-                dlspeed = downloadedChunk // (time.clock() - start) / 1000
-                progressTxt = '<b>Downloading {0}</b>:<br/>{1} of <b>{3}</b> [{2:.2%}] [{4} kbps]' \
-                    .format(filename, downloadedChunk, progress, size(filesize, system=alternative), dlspeed)
-                self.dlProgressTxt.emit(progressTxt)
-        self.dlComplete.emit()
+        if self.fetch(self.download_link) == 'error':
+            self.dlFailed.emit(self.download_link)
+        else:
+            self.dlComplete.emit()
 
+    @profiled('download')
     def run(self) -> None:
         self.download_file()
+
+
+class FailoverDownloadThread(DownloadThread):
+    dlMirror = pyqtSignal(str)
+
+    def __init__(self, mirrors: list, dl_path: str, settings: QSettings, api_url: str, min_speed: int):
+        DownloadThread.__init__(self, mirrors[0], dl_path)
+        self.mirrors = mirrors
+        self.min_speed = min_speed
+        self.use_realdebrid = len(settings.value('realdebrid_apitoken') or '') > 0
+        proxies = ShadowSocks.proxies() if settings.value('realdebrid_apiproxy', False, bool) else {}
+        self.realdebrid = RealDebridClient(api_url, settings.value('realdebrid_apitoken'), proxies)
+        self.resolved = {}
+        self.last_mirror = mirrors[0]
+
+    def resolve(self, mirror: str) -> str:
+        from requests import RequestException
+        if not self.use_realdebrid or RealDebridClient.is_unrestricted(mirror):
+            return mirror
+        if mirror not in self.resolved:
+            try:
+                self.resolved[mirror] = self.realdebrid.unrestrict(mirror).get('download')
+            except (RequestException, ValueError):
+                self.resolved[mirror] = None
+        return self.resolved[mirror]
+
+    def try_mirror(self, mirror: str, min_speed: int) -> str:
+        self.last_mirror = mirror
+        link = self.resolve(mirror)
+        if link is None:
+            return 'error'
+        self.dlMirror.emit(mirror)
+        return self.fetch(link, min_speed, hostnames.resolve(mirror))
+
+    def download_file(self) -> None:
+        # first pass drops mirrors that stay below min_speed, second pass settles for the slow ones
+        slow = []
+        for mirror in self.mirrors:
+            status = self.try_mirror(mirror, self.min_speed if mirror != self.mirrors[-1] else 0)
+            if status in ('complete', 'cancelled'):
+                self.dlComplete.emit()
+                return
+            elif status == 'slow':
+                slow.append(mirror)
+        for mirror in slow:
+            if self.try_mirror(mirror, 0) in ('complete', 'cancelled'):
+                self.dlComplete.emit()
+                return
+        self.dlFailed.emit(self.last_mirror)
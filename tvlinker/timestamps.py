@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+import time
+from datetime import datetime
+from functools import lru_cache
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    # noinspection PyPackageRequirements
+    from backports.zoneinfo import ZoneInfo
+
+# Scene-RLS publishes post times in central european time, including its DST switch
+SOURCE_TIMEZONE = 'Europe/Berlin'
+DISPLAY_FORMAT = '%b %d %Y %H:%M'
+
+MONTHS = {name: num for num, name in enumerate(('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                                                'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1)}
+_post_time = re.compile(r'^\s*([A-Z][a-z]{2})\s+(\d{1,2})\s+(\d{4})\s+(\d{1,2}):(\d{2})\s*$')
+
+
+@lru_cache(maxsize=8)
+def get_zone(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+
+def parse_timestamp(text: str, zone: str = SOURCE_TIMEZONE) -> int:
+    """Convert a post time in the fixed '%b %d %Y %H:%M' format to epoch seconds.
+
+    >>> parse_timestamp('Jan 15 2020 13:45')
+    1579092300
+    >>> parse_timestamp('Jul 15 2020 13:45')
+    1594813500
+    """
+    m = _post_time.match(text)
+    if m is None or m.group(1) not in MONTHS:
+        dt = datetime.strptime(text.strip(), DISPLAY_FORMAT)
+    else:
+        dt = datetime(int(m.group(3)), MONTHS[m.group(1)], int(m.group(2)), int(m.group(4)), int(m.group(5)))
+    return int(dt.replace(tzinfo=get_zone(zone)).timestamp())
+
+
+@lru_cache(maxsize=4096)
+def format_timestamp(epoch: int, fmt: str = DISPLAY_FORMAT) -> str:
+    return time.strftime(fmt, time.localtime(epoch))